@@ -7,8 +7,8 @@
 ###
 
 import pygame
-import time
 import rsc
+from concurrent.futures import ThreadPoolExecutor
 
 
 
@@ -113,6 +113,11 @@ class LoadingMenu(Menu):
 
         self.effectNum = 0
 
+        # The effects step (next slide or flash) on the game's clock instead
+        # of sleeping, hence the game loop keeps running in between steps
+        self.isStepDue = False
+        self.nextStepTime = 0
+
         self.initializeSlideShowEffect(slideFPS=0.3)
         self.initializeFlashEffect(flashesThreshold=6, flashFPS=0.3)
 
@@ -121,21 +126,27 @@ class LoadingMenu(Menu):
         """
         The core logic of how the two effects are executed. 
         slideShowEffect --> flashEffect
-        This method updates the effect being executed.  
+        This method updates the effect being executed. A step of the effect is
+        due once its delay (slideFPS or flashFPS seconds) has passed since the
+        previous step.
         """
 
-        # if effect 1 running
-        if self.effectNum == 1:
-            time.sleep(self.slideFPS)
+        ticks = pygame.time.get_ticks()
 
         # check if transition possible: effect 1 to effect 2
-        if self.frameNum > len(self.artworkDict):
+        if self.effectNum == 1 and self.frameNum > len(self.slideFutureList):
             self.effectNum = 2
 
-        # if effect 2 running
-        if self.effectNum == 2:
-            time.sleep(self.flashFPS)
+        self.isStepDue = self.effectNum != 0 and ticks >= self.nextStepTime
+
+        if self.isStepDue:
+            if self.effectNum == 1:
+                self.nextStepTime = ticks + self.slideFPS * 1000
+            else:
+                self.nextStepTime = ticks + self.flashFPS * 1000
 
+        # if effect 2 running
+        if self.effectNum == 2 and self.isStepDue:
             if self.flashesDone > self.flashesThreshold:
                 self.safelyEnd()
 
@@ -150,6 +161,14 @@ class LoadingMenu(Menu):
         if self.effectNum == 0:
             self.effectNum = 1
 
+            # slides are released when the loading screen ends
+            if not self.slideFutureList:
+                self.prepareSlides()
+
+        # the screen keeps showing the previous step until the next is due
+        elif not self.isStepDue:
+            pass
+
         elif self.effectNum == 1:
             self.applySlideShowEffect()
 
@@ -173,14 +192,14 @@ class LoadingMenu(Menu):
 
     def applySlideShowEffect(self):
         """
-        Draws an image on the screen from images stored in a dictionary then
-        increments the key of the dictionary.
+        Draws the next slide (already scaled to the screen) on the screen then
+        increments the slide number.
         """
 
-        frame = self.artworkDict[self.frameNum].convert()
-        frame = pygame.transform.scale(frame, self.screen.get_size())
+        # Only waits if the worker thread hasn't prepared the slide yet
+        slide = self.slideFutureList[self.frameNum - 1].result()
 
-        self.screen.blit(frame, (0,0))
+        self.screen.blit(slide, (0,0))
 
         self.frameNum += 1
 
@@ -209,7 +228,36 @@ class LoadingMenu(Menu):
 
         self.slideFPS = slideFPS  # Frames Per Second
         self.frameNum = 1
-        self.artworkDict = rsc.loadArtworkFrom(rsc.LOADINGSCREENARTS)
+
+        self.slideExecutor = ThreadPoolExecutor(max_workers=1)
+        self.prepareSlides()
+
+
+    def prepareSlides(self):
+        """
+        Lists the slides then decodes and scales them to the screen's size on
+        a worker thread, in order, so that the first slide can be shown while
+        the others are still being prepared.
+        """
+
+        pathDict = rsc.findArtworkPaths(rsc.LOADINGSCREENARTS)
+        screenSize = self.screen.get_size()
+
+        self.slideFutureList = [self.slideExecutor.submit(self.scaleSlide,
+                                                          pathDict[num],
+                                                          screenSize)
+                                for num in sorted(pathDict)]
+
+
+    @staticmethod
+    def scaleSlide(imagePath, screenSize):
+        """
+        Returns the image decoded and scaled to the screen's size (runs on the
+        worker thread). It is left unconverted as converting needs the display
+        and each slide is only blitted once per slideshow anyway.
+        """
+
+        return pygame.transform.scale(pygame.image.load(imagePath), screenSize)
 
 
     def safelyEnd(self):
@@ -223,6 +271,11 @@ class LoadingMenu(Menu):
         self.effectNum = 0
         self.frameNum = 1
         self.flashesDone = 0
+        self.isStepDue = False
+        self.nextStepTime = 0
+
+        # The scaled slides are only needed again if the loading screen reruns
+        self.slideFutureList = []
 
 
 
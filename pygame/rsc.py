@@ -140,7 +140,18 @@ def loadArtworkFrom(dirPath):
     chronologically in order for other methods to work properly.
     """
 
-    imageDict = {}
+    return {index: pygame.image.load(imagePath) for index, imagePath in
+            findArtworkPaths(dirPath).items()}
+
+
+def findArtworkPaths(dirPath):
+    """
+    Returns the dictionary of the image paths of the directory, numbered as
+    'loadArtworkFrom' numbers the images, without decoding them (e.g. so
+    they can be decoded on another thread).
+    """
+
+    pathDict = {}
 
     if os.path.exists(dirPath):
 
@@ -151,12 +162,11 @@ def loadArtworkFrom(dirPath):
             for index, imageName in enumerate(imagesList, 1):
 
                 if not imageName.endswith(".db"):
-                    imagePath = os.path.join(dirPath, imageName)
-                    imageDict[index] = pygame.image.load(imagePath)
+                    pathDict[index] = os.path.join(dirPath, imageName)
 
         else:
             raise OSError("No images found in the specified directory.")
     else:
         raise OSError("Specified directory does not exist.")
 
-    return imageDict
\ No newline at end of file
+    return pathDict
\ No newline at end of file
@@ -0,0 +1,150 @@
+### The module that contains the animation clips (the frames of an animation,
+### how long each frame lasts and how it loops) and the animator that plays
+### them on the game's clock, independently of the in-game frame rate.
+
+import pygame
+
+
+# Loop modes of the animation clips
+LOOP = "loop"           # restarts from the first frame
+ONCE = "once"           # holds the last frame
+PINGPONG = "pingpong"   # plays forwards then backwards
+
+
+
+class AnimationClip():
+    """
+    An animation: a tuple of frames each shown for 'frameDuration'
+    milliseconds, played according to its loop mode. The frames can be given
+    as a lazy artwork handle (see 'res.LazyArtwork') in which case they are
+    only loaded (and compiled into a tuple ordered by their keys) the first
+    time the clip is played.
+    """
+
+    def __init__(self, frames, fps, loopMode=LOOP):
+        """
+        'frames' is either a sequence of surfaces or a lazy artwork handle.
+        'fps' is the amount of animation frames played per second.
+        """
+
+        if loopMode not in (LOOP, ONCE, PINGPONG):
+            raise ValueError("Unknown loop mode '{}'.".format(loopMode))
+
+        if hasattr(frames, "load"):
+            self.artwork = frames
+            self.frames = None
+        else:
+            self.artwork = None
+            self.frames = tuple(frames)
+
+        self.frameDuration = 1000 / fps
+        self.loopMode = loopMode
+
+
+    def getFrames(self):
+        """
+        Returns the tuple of frames, loading the artwork on the first call.
+        """
+
+        if self.frames is None:
+            artworkDict = self.artwork.load()
+            self.frames = tuple(artworkDict[key] for key in sorted(artworkDict))
+
+        return self.frames
+
+
+    def getFrameNum(self, elapsed):
+        """
+        Returns the index of the frame shown 'elapsed' milliseconds after the
+        clip started.
+        """
+
+        frameAmount = len(self.getFrames())
+        frameNum = int(elapsed // self.frameDuration)
+
+        if self.loopMode == LOOP:
+            return frameNum % frameAmount
+
+        if self.loopMode == ONCE or frameAmount == 1:
+            return min(frameNum, frameAmount - 1)
+
+        # Ping-pong doesn't repeat the first and last frames when turning
+        frameNum %= 2 * frameAmount - 2
+        if frameNum < frameAmount:
+            return frameNum
+        return 2 * frameAmount - 2 - frameNum
+
+
+    def getFrame(self, elapsed):
+        """
+        Returns the frame shown 'elapsed' milliseconds after the clip started.
+        """
+
+        return self.getFrames()[self.getFrameNum(elapsed)]
+
+
+    def isFinished(self, elapsed):
+        """
+        Checks whether a clip that plays once has shown its last frame for its
+        whole duration (looping clips never finish).
+        """
+
+        if self.loopMode != ONCE:
+            return False
+
+        return elapsed >= len(self.getFrames()) * self.frameDuration
+
+
+
+class Animator():
+    """
+    Plays one animation clip at a time. The frame shown is computed from the
+    time elapsed since the clip started hence animations play at the same
+    speed whatever the in-game frame rate.
+    """
+
+    def __init__(self):
+        """
+        Initializes an animator that isn't playing any clip yet.
+        """
+
+        self.clip = None
+        self.startTicks = 0
+
+
+    def play(self, clip, ticks=None):
+        """
+        Plays the clip from its first frame, unless it is already playing.
+        'ticks' is the game's clock in milliseconds
+        ('pygame.time.get_ticks()' by default).
+        """
+
+        if clip is not self.clip:
+            if ticks is None:
+                ticks = pygame.time.get_ticks()
+
+            self.clip = clip
+            self.startTicks = ticks
+
+
+    def getFrame(self, ticks=None):
+        """
+        Returns the frame of the clip being played at 'ticks'.
+        """
+
+        if ticks is None:
+            ticks = pygame.time.get_ticks()
+
+        return self.clip.getFrame(ticks - self.startTicks)
+
+
+    def isFinished(self, ticks=None):
+        """
+        Checks whether the clip being played has finished (see
+        'AnimationClip.isFinished').
+        """
+
+        if ticks is None:
+            ticks = pygame.time.get_ticks()
+
+        return self.clip.isFinished(ticks - self.startTicks)
@@ -0,0 +1,135 @@
+### Compares the frame time of the presentation backends (software surfaces
+### upscaled onto the window vs an SDL2 renderer) on a level-like scene: a
+### tiled background plus many animated sprites drawn through the render queue.
+###
+### Usage (from the game's directory): python benchmark.py [frames] [sprites]
+### Set SDL_VIDEODRIVER=dummy to run it without a display (e.g. on CI).
+
+
+import pygame
+import random
+import sys
+import time
+import res
+import render
+
+
+
+def buildScene(screen, spriteAmount):
+    """
+    Returns the background surface (random tiles covering the screen) and a
+    list of [frameList, x, y, dx, dy] sprites bouncing around the screen.
+    """
+
+    tileList = list(res.loadArtworkFrom(res.ART_MISC, "tile").values())
+    tileWidth, tileHeight = tileList[0].get_size()
+    screenWidth, screenHeight = screen.get_size()
+
+    background = pygame.Surface((screenWidth, screenHeight)).convert()
+    background.blits([(random.choice(tileList), (x, y))
+                      for x in range(0, screenWidth, tileWidth)
+                      for y in range(0, screenHeight, tileHeight)],
+                     doreturn=False)
+
+    artworkDict = res.loadArtworkFrom(res.ART_SPRITE_NAMELESS, "moving")
+    frameList = [artworkDict[key] for key in sorted(artworkDict)]
+
+    spriteList = []
+    for _ in range(spriteAmount):
+        spriteList.append([frameList,
+                           random.randrange(screenWidth),
+                           random.randrange(screenHeight),
+                           random.choice((-3, -2, 2, 3)),
+                           random.choice((-3, -2, 2, 3))])
+
+    return background, spriteList
+
+
+def runScene(screen, present, frames, spriteAmount):
+    """
+    Draws the scene for the amount of frames given, presenting each frame
+    through 'present'. Returns the mean frame time in milliseconds.
+    """
+
+    random.seed(0)
+    background, spriteList = buildScene(screen, spriteAmount)
+    screenWidth, screenHeight = screen.get_size()
+
+    startTime = time.perf_counter()
+
+    for frameNum in range(frames):
+        pygame.event.pump()
+        screen.blit(background, (0, 0))
+
+        for sprite in spriteList:
+            frameList, x, y, dx, dy = sprite
+
+            sprite[1] = x = (x + dx) % screenWidth
+            sprite[2] = y = (y + dy) % screenHeight
+
+            render.renderQueue.submit(render.SPRITELAYER,
+                                      frameList[frameNum % len(frameList)],
+                                      (x, y))
+
+        present()
+
+    return (time.perf_counter() - startTime) * 1000 / frames
+
+
+def benchmarkSurface(frames, spriteAmount):
+    """
+    Measures the software surface path: the render queue is flushed onto the
+    logical screen which is presented through the upscaler and flipped.
+    """
+
+    window = pygame.display.set_mode(res.DEFAULTSCREENSIZE)
+    render.upscaler = render.Upscaler(window, res.LOGICALSCREENSIZE)
+    screen = render.upscaler.screen
+
+    def present():
+        render.renderQueue.flush(screen)
+        render.updateDisplay()
+
+    frameTime = runScene(screen, present, frames, spriteAmount)
+    render.upscaler = None
+
+    return frameTime
+
+
+def benchmarkTexture(frames, spriteAmount, isAccelerated):
+    """
+    Measures the SDL2 renderer path: the screen surface is uploaded once per
+    frame and the queued sprites are drawn as texture copies.
+    """
+
+    textureRenderer = render.TextureRenderer(res.DEFAULTSCREENSIZE,
+                                             res.LOGICALSCREENSIZE,
+                                             isAccelerated=isAccelerated)
+
+    def present():
+        textureRenderer.present(render.renderQueue)
+
+    return runScene(textureRenderer.screen, present, frames, spriteAmount)
+
+
+if __name__ == "__main__":
+
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    spriteAmount = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    pygame.init()
+
+    resultsList = [("surface (software)",
+                    benchmarkSurface(frames, spriteAmount)),
+                   ("texture (software renderer)",
+                    benchmarkTexture(frames, spriteAmount, False))]
+
+    try:
+        resultsList.append(("texture (accelerated renderer)",
+                            benchmarkTexture(frames, spriteAmount, True)))
+    except RuntimeError:
+        pass    # no GPU renderer available
+
+    print("{} frames, {} sprites:".format(frames, spriteAmount))
+    for backend, frameTime in resultsList:
+        print("  {:<32}{:.2f} ms/frame".format(backend, frameTime))
@@ -0,0 +1,109 @@
+### Offline bundling step: writes every artwork image as a raw pixel buffer
+### plus an index into a single file that res.loadBundle memory-maps at startup.
+###
+### Usage (from the game's directory): python bundle.py [artworkDir] [bundlePath]
+
+
+import pygame
+import json
+import os
+import struct
+import sys
+import time
+import res
+
+
+
+def findImages(rootPath):
+    """
+    Walks the artwork directory and returns a sorted list of the paths of all
+    the images in it.
+    """
+
+    imagePathsList = []
+    for dirPath, _, imagesList in os.walk(rootPath):
+        for imageName in imagesList:
+            if imageName.lower().endswith(".png"):
+                imagePathsList.append(
+                    os.path.normpath(os.path.join(dirPath, imageName)))
+
+    return sorted(imagePathsList)
+
+
+def buildBundle(rootPath="artwork", bundlePath=res.ART_BUNDLE):
+    """
+    Decodes every image under rootPath and writes the bundle. The time the
+    decoding took is stored in the index so the runtime loader can report
+    the startup time saved. Returns the index.
+    """
+
+    imagePathsList = findImages(rootPath)
+
+    if not imagePathsList:
+        raise OSError("No images found in the specified directory.")
+
+    bufferList = []
+    index = {"images": {}}
+    offset = 0
+
+    startTime = time.perf_counter()
+
+    for imagePath in imagePathsList:
+        image = pygame.image.load(imagePath)
+        buffer = pygame.image.tostring(image, res.BUNDLEPIXELFORMAT)
+        fileStat = os.stat(imagePath)
+
+        index["images"][imagePath] = {"offset": offset,
+                                      "length": len(buffer),
+                                      "size": image.get_size(),
+                                      "mtime": fileStat.st_mtime_ns,
+                                      "fileSize": fileStat.st_size}
+
+        bufferList.append(buffer)
+        offset += len(buffer)
+
+    index["decodeTime"] = time.perf_counter() - startTime
+
+    # The index stores the data offset which itself depends on the index
+    # length, hence the offset is reserved with a fixed width placeholder.
+    index["dataOffset"] = 0
+    headerSize = struct.calcsize(res.BUNDLEHEADER)
+    indexLength = len(json.dumps(index).encode("utf-8")) + 20
+    index["dataOffset"] = alignTo(headerSize + indexLength, 16)
+
+    indexBytes = json.dumps(index).encode("utf-8").ljust(indexLength)
+
+    with open(bundlePath, "wb") as bundleFile:
+        bundleFile.write(struct.pack(res.BUNDLEHEADER, res.BUNDLEMAGIC,
+                                     indexLength))
+        bundleFile.write(indexBytes)
+        bundleFile.write(bytes(index["dataOffset"] - bundleFile.tell()))
+
+        for buffer in bufferList:
+            bundleFile.write(buffer)
+
+    return index
+
+
+def alignTo(number, alignment):
+    """
+    Rounds the number up to the next multiple of alignment.
+    """
+
+    return (number + alignment - 1) // alignment * alignment
+
+
+if __name__ == "__main__":
+
+    rootPath = sys.argv[1] if len(sys.argv) > 1 else "artwork"
+    bundlePath = sys.argv[2] if len(sys.argv) > 2 else res.ART_BUNDLE
+
+    index = buildBundle(rootPath, bundlePath)
+    report = res.loadBundle(bundlePath)
+
+    print("Bundled {} images into '{}'.".format(len(index["images"]),
+                                                bundlePath))
+    print("PNG decoding: {:.1f} ms, bundle mapping: {:.1f} ms, "
+          "saved: {:.1f} ms.".format(report["decodeTime"] * 1000,
+                                     report["loadTime"] * 1000,
+                                     report["timeSaved"] * 1000))
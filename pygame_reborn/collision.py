@@ -0,0 +1,656 @@
+### The module that contains the collision broadphase: a spatial hash that
+### buckets the world rects of the level's moving sprites (doors, enemies,
+### fireballs, hooks and the player) into a uniform grid so that the collision
+### and aggro checks only test the sprites nearby instead of every sprite, and
+### an occupancy grid of the level's static solids (platforms) looked up cell by
+### cell. Moving rects can also be swept against both (continuous collision) so
+### that fast sprites don't tunnel through thin solids, and rays can be cast
+### through both cell by cell (e.g. to find where a hook anchors up front).
+
+import pygame
+import array
+import math
+
+
+# Makes it easier to identify where the exceptions stem from
+class collisionError(Exception):
+    pass
+
+
+# The cell value of the occupancy grid marking a cell shared by several solids
+SHAREDCELL = 255
+
+
+
+def sweepRect(rect, dx, dy, targetRect):
+    """
+    Sweeps the rect along the displacement (dx, dy) against the target rect.
+    Returns (timeOfImpact, normal) of their first contact, where the time of
+    impact is the fraction of the displacement travelled before touching (0 to
+    1) and the normal is the unit vector of the target's side touched (e.g.
+    (0, -1) for its top). Returns None if the rect doesn't reach the target or
+    already collides with it (which the discrete checks handle).
+    """
+
+    entryx, exitx = getSlabTimes(rect.left, rect.right, targetRect.left,
+                                 targetRect.right, dx)
+    entryy, exity = getSlabTimes(rect.top, rect.bottom, targetRect.top,
+                                 targetRect.bottom, dy)
+
+    timeOfImpact = max(entryx, entryy)
+
+    if timeOfImpact >= min(exitx, exity) or not 0 <= timeOfImpact < 1:
+        return None
+
+    if entryx > entryy:
+        normal = (-1, 0) if dx > 0 else (1, 0)
+    else:
+        normal = (0, -1) if dy > 0 else (0, 1)
+
+    return timeOfImpact, normal
+
+
+def getSlabTimes(start, end, targetStart, targetEnd, displacement):
+    """
+    Returns the times (as fractions of the displacement) at which the segment
+    from start to end, moving along one axis, starts and stops overlapping the
+    target segment on that axis.
+    """
+
+    if displacement > 0:
+        return ((targetStart - end) / displacement,
+                (targetEnd - start) / displacement)
+
+    if displacement < 0:
+        return ((targetEnd - start) / displacement,
+                (targetStart - end) / displacement)
+
+    # Not moving along the axis: either always or never overlapping
+    if end <= targetStart or start >= targetEnd:
+        return math.inf, -math.inf
+
+    return -math.inf, math.inf
+
+
+def getSweptRect(rect, dx, dy):
+    """
+    Returns the rect covering the whole path of the rect along (dx, dy).
+    """
+
+    rect = pygame.Rect(rect)
+    endRect = rect.move(math.floor(dx), math.floor(dy))
+
+    return rect.union(endRect).union(endRect.move(1, 1))
+
+
+def sweep(rect, dx, dy, occupancyGrid, spatialHash, ignoredPrefixes=()):
+    """
+    Sweeps the rect along (dx, dy) against the solids of the occupancy grid and
+    the sprites of the spatial hash (except those whose names start with any
+    of the ignored prefixes). Returns (timeOfImpact, normal, name, rect) of the
+    first contact or None (see 'sweepRect').
+    """
+
+    contactsList = [occupancyGrid.sweepRect(rect, dx, dy),
+                    spatialHash.sweepRect(rect, dx, dy, ignoredPrefixes)]
+    contactsList = [contact for contact in contactsList if contact]
+
+    if not contactsList:
+        return None
+
+    return min(contactsList, key=lambda contact: contact[0])
+
+
+
+def castRayOnRect(origin, direction, rect):
+    """
+    Casts a ray from the origin along the direction (a unit vector) against
+    the rect. Returns the distance travelled before hitting the rect or None
+    if the ray misses it or starts within it.
+    """
+
+    entryx, exitx = getSlabTimes(origin[0], origin[0], rect.left, rect.right,
+                                 direction[0])
+    entryy, exity = getSlabTimes(origin[1], origin[1], rect.top, rect.bottom,
+                                 direction[1])
+
+    distance = max(entryx, entryy)
+
+    if distance >= min(exitx, exity) or distance < 0:
+        return None
+
+    return distance
+
+
+def getRayExit(origin, direction, rect):
+    """
+    Returns the distance a ray from the origin (within the rect) along the
+    direction (a unit vector) travels before leaving the rect.
+    """
+
+    _, exitx = getSlabTimes(origin[0], origin[0], rect.left, rect.right,
+                            direction[0])
+    _, exity = getSlabTimes(origin[1], origin[1], rect.top, rect.bottom,
+                            direction[1])
+
+    return max(min(exitx, exity), 0)
+
+
+def traverseCells(origin, direction, maxDistance, gridOrigin, cellWidth,
+                  cellHeight):
+    """
+    Yields every (cellx, celly, distance) cell crossed by a ray from the origin
+    along the direction (a unit vector) in order, up to 'maxDistance', where
+    distance is how far the ray travelled before entering the cell. The cells
+    are walked one boundary at a time (DDA) hence only the cells on the ray
+    are visited.
+    """
+
+    x = origin[0] - gridOrigin[0]
+    y = origin[1] - gridOrigin[1]
+    directionx, directiony = direction
+
+    cellx = math.floor(x / cellWidth)
+    celly = math.floor(y / cellHeight)
+    stepx = 1 if directionx > 0 else -1
+    stepy = 1 if directiony > 0 else -1
+
+    # The distances to the next vertical and horizontal cell boundaries and
+    # between two consecutive boundaries
+    if directionx:
+        nextx = ((cellx + (stepx > 0)) * cellWidth - x) / directionx
+        deltax = cellWidth / abs(directionx)
+    else:
+        nextx = deltax = math.inf
+
+    if directiony:
+        nexty = ((celly + (stepy > 0)) * cellHeight - y) / directiony
+        deltay = cellHeight / abs(directiony)
+    else:
+        nexty = deltay = math.inf
+
+    distance = 0
+
+    while distance <= maxDistance:
+        yield cellx, celly, distance
+
+        if nextx < nexty:
+            distance = nextx
+            nextx += deltax
+            cellx += stepx
+        else:
+            distance = nexty
+            nexty += deltay
+            celly += stepy
+
+
+def castRay(origin, direction, maxDistance, occupancyGrid, spatialHash,
+            ignoredPrefixes=()):
+    """
+    Casts a ray from the origin along the direction (a unit vector), up to
+    'maxDistance', against the solids of the occupancy grid and the sprites of
+    the spatial hash (except those whose names start with any of the ignored
+    prefixes). Returns (distance, name, rect) of the first hit or None.
+    """
+
+    hitsList = [occupancyGrid.castRay(origin, direction, maxDistance),
+                spatialHash.castRay(origin, direction, maxDistance,
+                                    ignoredPrefixes)]
+    hitsList = [hit for hit in hitsList if hit]
+
+    if not hitsList:
+        return None
+
+    return min(hitsList, key=lambda hit: hit[0])
+
+
+
+class SpatialHash():
+    """
+    Stores named world rects in square cells of 'cellSize' pixels, a rect
+    being stored in every cell it overlaps. A query only tests the rects stored
+    in the cells it overlaps hence its cost doesn't grow with the size of the
+    level. Rects are moved incrementally (see 'update'): only the cells a rect
+    left or entered are touched.
+    """
+
+    def __init__(self, cellSize=64):
+        """
+        Initializes an empty spatial hash.
+        """
+
+        self.cellSize = cellSize
+
+        self.rectsDict = {}         # name: rect
+        self.cellRangesDict = {}    # name: (left, top, right, bottom) cells
+        self.cellsDict = {}         # (cellx, celly): set of names
+
+
+    def getCellRange(self, rect):
+        """
+        Returns the (left, top, right, bottom) cells (inclusive) that the rect
+        overlaps.
+        """
+
+        left = rect.left // self.cellSize
+        top = rect.top // self.cellSize
+
+        # Rects don't include their right and bottom edges
+        right = max(rect.right - 1, rect.left) // self.cellSize
+        bottom = max(rect.bottom - 1, rect.top) // self.cellSize
+
+        return left, top, right, bottom
+
+
+    @staticmethod
+    def iterateCells(cellRange):
+        """
+        Yields every cell within the cell range.
+        """
+
+        left, top, right, bottom = cellRange
+
+        for cellx in range(left, right + 1):
+            for celly in range(top, bottom + 1):
+                yield cellx, celly
+
+
+    def update(self, name, rect):
+        """
+        Inserts the named rect or moves it to its new position. A copy of the
+        rect is stored, since the sprites keep moving their own rect in place
+        and the stored rect must stay within the cells it is binned in.
+        """
+
+        rect = pygame.Rect(rect)
+        cellRange = self.getCellRange(rect)
+        oldCellRange = self.cellRangesDict.get(name)
+
+        self.rectsDict[name] = rect
+
+        # Most moves stay within the same cells
+        if cellRange == oldCellRange:
+            return
+
+        if oldCellRange is not None:
+            self.removeFromCells(name, oldCellRange)
+
+        for cell in self.iterateCells(cellRange):
+            self.cellsDict.setdefault(cell, set()).add(name)
+
+        self.cellRangesDict[name] = cellRange
+
+
+    def remove(self, name):
+        """
+        Removes the named rect (if stored).
+        """
+
+        if name in self.rectsDict:
+            self.removeFromCells(name, self.cellRangesDict.pop(name))
+            del self.rectsDict[name]
+
+
+    def removeFromCells(self, name, cellRange):
+        """
+        Removes the name from the cells of the cell range, dropping the cells
+        left empty.
+        """
+
+        for cell in self.iterateCells(cellRange):
+            namesSet = self.cellsDict[cell]
+            namesSet.discard(name)
+
+            if not namesSet:
+                del self.cellsDict[cell]
+
+
+    def clear(self):
+        """
+        Removes every rect.
+        """
+
+        self.rectsDict = {}
+        self.cellRangesDict = {}
+        self.cellsDict = {}
+
+
+    def getCandidates(self, cellRange):
+        """
+        Returns the set of names stored in the cells of the cell range.
+        """
+
+        candidatesSet = set()
+
+        for cell in self.iterateCells(cellRange):
+            if cell in self.cellsDict:
+                candidatesSet.update(self.cellsDict[cell])
+
+        return candidatesSet
+
+
+    def queryRect(self, rect):
+        """
+        Returns a dictionary of the stored rects colliding with the rect (as
+        'pygame.Rect.colliderect' defines it) keyed by name.
+        """
+
+        rect = pygame.Rect(rect)
+        collidedDict = {}
+
+        for name in self.getCandidates(self.getCellRange(rect)):
+            spriteRect = self.rectsDict[name]
+
+            if rect.colliderect(spriteRect):
+                collidedDict[name] = spriteRect
+
+        return collidedDict
+
+
+    def queryPoint(self, point):
+        """
+        Returns a dictionary of the stored rects containing the point keyed by
+        name.
+        """
+
+        cellx = int(point[0] // self.cellSize)
+        celly = int(point[1] // self.cellSize)
+        collidedDict = {}
+
+        for name in self.cellsDict.get((cellx, celly), ()):
+            spriteRect = self.rectsDict[name]
+
+            if spriteRect.collidepoint(point):
+                collidedDict[name] = spriteRect
+
+        return collidedDict
+
+
+    def queryRadius(self, center, radius):
+        """
+        Returns a dictionary of the stored rects that are at most 'radius'
+        pixels away from the center (i.e. overlapping that circle) keyed by
+        name.
+        """
+
+        x, y = center
+        boundingRect = pygame.Rect(0, 0, 2*radius + 1, 2*radius + 1)
+        boundingRect.center = (int(x), int(y))
+        collidedDict = {}
+
+        for name in self.getCandidates(self.getCellRange(boundingRect)):
+            spriteRect = self.rectsDict[name]
+
+            # The closest point of the rect to the center
+            closestx = min(max(x, spriteRect.left), spriteRect.right)
+            closesty = min(max(y, spriteRect.top), spriteRect.bottom)
+
+            if (closestx - x)**2 + (closesty - y)**2 <= radius**2:
+                collidedDict[name] = spriteRect
+
+        return collidedDict
+
+
+    def sweepRect(self, rect, dx, dy, ignoredPrefixes=()):
+        """
+        Sweeps the rect along (dx, dy) against the stored rects near its path
+        (except those whose names start with any of the ignored prefixes).
+        Returns (timeOfImpact, normal, name, rect) of the first contact or None
+        (see 'sweepRect').
+        """
+
+        sweptRect = getSweptRect(rect, dx, dy)
+        firstContact = None
+
+        for name in self.getCandidates(self.getCellRange(sweptRect)):
+            if name.startswith(ignoredPrefixes):
+                continue
+
+            spriteRect = self.rectsDict[name]
+            contact = sweepRect(rect, dx, dy, spriteRect)
+
+            if contact and (not firstContact or contact[0] < firstContact[0]):
+                firstContact = contact + (name, spriteRect)
+
+        return firstContact
+
+
+    def castRay(self, origin, direction, maxDistance, ignoredPrefixes=()):
+        """
+        Casts a ray from the origin along the direction (a unit vector), up to
+        'maxDistance', against the stored rects in the cells it crosses (except
+        those whose names start with any of the ignored prefixes). Returns
+        (distance, name, rect) of the first hit or None.
+        """
+
+        firstHit = None
+        testedSet = set()
+
+        for cellx, celly, distance in traverseCells(origin, direction,
+                                                    maxDistance, (0, 0),
+                                                    self.cellSize,
+                                                    self.cellSize):
+            # Every cell left to cross is further than the hit
+            if firstHit and distance > firstHit[0]:
+                break
+
+            for name in self.cellsDict.get((cellx, celly), ()):
+                if name in testedSet or name.startswith(ignoredPrefixes):
+                    continue
+
+                testedSet.add(name)
+                spriteRect = self.rectsDict[name]
+                hitDistance = castRayOnRect(origin, direction, spriteRect)
+
+                if hitDistance is not None and hitDistance <= maxDistance and \
+                        (not firstHit or hitDistance < firstHit[0]):
+                    firstHit = (hitDistance, name, spriteRect)
+
+        return firstHit
+
+
+
+class OccupancyGrid():
+    """
+    The static solids of a level (e.g. platforms) compiled into a packed grid
+    of cells, one byte per cell in row-major order storing the id of the solid
+    occupying the cell (0 for an empty cell). The few cells shared by several
+    solids (e.g. where solids not aligned to the cells meet) are marked 255 and
+    their ids are kept in a dictionary instead. Collisions against the solids
+    are then a handful of cell lookups around a rect instead of a rect test
+    against every solid.
+    """
+
+    def __init__(self, gridRect, cellWidth, cellHeight):
+        """
+        Creates an empty grid of cells of 'cellWidth' by 'cellHeight' pixels
+        covering 'gridRect' (in world coordinates) from its top-left.
+        """
+
+        self.gridRect = pygame.Rect(gridRect)
+        self.cellWidth = cellWidth
+        self.cellHeight = cellHeight
+
+        # Partial cells on the right and bottom edges are still cells
+        self.amountCellsx = -(-self.gridRect.width // cellWidth)
+        self.amountCellsy = -(-self.gridRect.height // cellHeight)
+
+        self.cells = array.array("B",
+                                 bytes(self.amountCellsx * self.amountCellsy))
+        self.solidsList = [None]    # solid id: (name, rect)
+        self.sharedDict = {}        # cell index: list of solid ids
+
+
+    def addSolid(self, name, rect):
+        """
+        Marks the cells that the named rect overlaps as occupied by it (as
+        well as by any solid already occupying them). Parts of the rect
+        outside of the grid are ignored.
+        """
+
+        if len(self.solidsList) > SHAREDCELL - 1:
+            raise collisionError("An occupancy grid holds at most {} solids."
+                                 .format(SHAREDCELL - 1))
+
+        solidId = len(self.solidsList)
+        self.solidsList.append((name, rect))
+
+        for cell in self.getCells(rect):
+            if self.cells[cell] == SHAREDCELL:
+                self.sharedDict[cell].append(solidId)
+            elif self.cells[cell]:
+                self.sharedDict[cell] = [self.cells[cell], solidId]
+                self.cells[cell] = SHAREDCELL
+            else:
+                self.cells[cell] = solidId
+
+
+    def getCells(self, rect):
+        """
+        Returns the list of indices of the cells that the rect overlaps (cells
+        outside of the grid are left out).
+        """
+
+        rect = pygame.Rect(rect)
+
+        left = max((rect.left - self.gridRect.left) // self.cellWidth, 0)
+        top = max((rect.top - self.gridRect.top) // self.cellHeight, 0)
+
+        # Rects don't include their right and bottom edges
+        right = min((max(rect.right - 1, rect.left) - self.gridRect.left) //
+                    self.cellWidth, self.amountCellsx - 1)
+        bottom = min((max(rect.bottom - 1, rect.top) - self.gridRect.top) //
+                     self.cellHeight, self.amountCellsy - 1)
+
+        return [row * self.amountCellsx + col
+                for row in range(top, bottom + 1)
+                for col in range(left, right + 1)]
+
+
+    def getSolidIds(self, cell):
+        """
+        Returns the ids of the solids occupying the cell of the index given
+        (empty if none).
+        """
+
+        solidId = self.cells[cell]
+
+        if solidId == SHAREDCELL:
+            return self.sharedDict[cell]
+        elif solidId:
+            return (solidId,)
+        return ()
+
+
+    def getSolidIdsAt(self, cellx, celly):
+        """
+        Returns the ids of the solids occupying the cell in column 'cellx' and
+        row 'celly' (empty if none or outside of the grid).
+        """
+
+        if 0 <= cellx < self.amountCellsx and 0 <= celly < self.amountCellsy:
+            return self.getSolidIds(celly * self.amountCellsx + cellx)
+
+        return ()
+
+
+    def getSolidIdsUnder(self, rect):
+        """
+        Returns the set of ids of the solids occupying the cells that the rect
+        overlaps.
+        """
+
+        solidIdSet = set()
+
+        for cell in self.getCells(rect):
+            solidIdSet.update(self.getSolidIds(cell))
+
+        return solidIdSet
+
+
+    def queryRect(self, rect):
+        """
+        Returns a dictionary of the solids' rects colliding with the rect (as
+        'pygame.Rect.colliderect' defines it) keyed by name. Only the cells
+        under the rect are looked up.
+        """
+
+        rect = pygame.Rect(rect)
+        collidedDict = {}
+
+        for solidId in self.getSolidIdsUnder(rect):
+            name, solidRect = self.solidsList[solidId]
+
+            # Solids that aren't aligned to the cells only partly fill them
+            if rect.colliderect(solidRect):
+                collidedDict[name] = solidRect
+
+        return collidedDict
+
+
+    def queryPoint(self, point):
+        """
+        Returns a dictionary of the solids' rects containing the point keyed by
+        name.
+        """
+
+        cellx = int((point[0] - self.gridRect.left) // self.cellWidth)
+        celly = int((point[1] - self.gridRect.top) // self.cellHeight)
+        collidedDict = {}
+
+        for solidId in self.getSolidIdsAt(cellx, celly):
+            name, solidRect = self.solidsList[solidId]
+
+            if solidRect.collidepoint(point):
+                collidedDict[name] = solidRect
+
+        return collidedDict
+
+
+    def sweepRect(self, rect, dx, dy):
+        """
+        Sweeps the rect along (dx, dy) against the solids occupying the cells
+        under its path. Returns (timeOfImpact, normal, name, rect) of the first
+        contact or None (see 'sweepRect').
+        """
+
+        sweptRect = getSweptRect(rect, dx, dy)
+        firstContact = None
+
+        for solidId in self.getSolidIdsUnder(sweptRect):
+            name, solidRect = self.solidsList[solidId]
+            contact = sweepRect(rect, dx, dy, solidRect)
+
+            if contact and (not firstContact or contact[0] < firstContact[0]):
+                firstContact = contact + (name, solidRect)
+
+        return firstContact
+
+
+    def castRay(self, origin, direction, maxDistance):
+        """
+        Casts a ray from the origin along the direction (a unit vector), up to
+        'maxDistance', looking up only the cells it crosses. Returns (distance,
+        name, rect) of the first solid hit or None.
+        """
+
+        firstHit = None
+
+        for cellx, celly, distance in traverseCells(origin, direction,
+                                                    maxDistance,
+                                                    self.gridRect.topleft,
+                                                    self.cellWidth,
+                                                    self.cellHeight):
+            # Every cell left to cross is further than the hit
+            if firstHit and distance > firstHit[0]:
+                break
+
+            for solidId in self.getSolidIdsAt(cellx, celly):
+                name, solidRect = self.solidsList[solidId]
+                hitDistance = castRayOnRect(origin, direction, solidRect)
+
+                if hitDistance is not None and hitDistance <= maxDistance and \
+                        (not firstHit or hitDistance < firstHit[0]):
+                    firstHit = (hitDistance, name, solidRect)
+
+        return firstHit
@@ -8,6 +8,7 @@ import sprite
 import level
 import menu
 import res
+import render
 import sys
 import traceback
 
@@ -20,9 +21,14 @@ class Game():
     """
 
 
-    def __init__(self):
+    def __init__(self, renderMode="flip", backend="surface"):
         """
-        Initializes pygame, in-game classes and sprites
+        Initializes pygame, in-game classes and sprites. 'renderMode' is
+        either "flip" (the whole screen is presented every frame) or "dirty"
+        (only the changed regions are presented). 'backend' is either
+        "surface" (frames are composited into software surfaces) or "texture"
+        (frames are composited by an SDL2 renderer, which always presents
+        whole frames hence only supports the "flip" render mode).
         """
 
         # pygame initialization
@@ -30,16 +36,57 @@ class Game():
         self.running = True
         self.clock = pygame.time.Clock()
 
-        #  screen initialization
-        self.screen = pygame.display.set_mode(res.DEFAULTSCREENSIZE,
-                                              pygame.RESIZABLE)
-        pygame.display.set_caption("Exiled")
+        #  screen initialization (the game is drawn onto a fixed resolution
+        #  screen which is upscaled onto the window)
+        if backend == "surface":
+            self.window = pygame.display.set_mode(res.DEFAULTSCREENSIZE,
+                                                  pygame.RESIZABLE)
+            pygame.display.set_caption("Exiled")
+
+            render.upscaler = render.Upscaler(self.window,
+                                              res.LOGICALSCREENSIZE)
+            self.screen = render.upscaler.screen
+
+        elif backend == "texture":
+            if renderMode != "flip":
+                raise ValueError("The 'texture' backend only supports the "
+                                 "'flip' render mode.")
+
+            render.textureRenderer = render.TextureRenderer(
+                res.DEFAULTSCREENSIZE, res.LOGICALSCREENSIZE, "Exiled")
+            self.screen = render.textureRenderer.screen
+
+        else:
+            raise ValueError("'backend' can only be 'surface' or 'texture'.")
+
+        if renderMode == "dirty":
+            render.dirtyRenderer = render.DirtyRectRenderer(self.screen)
+        elif renderMode != "flip":
+            raise ValueError("'renderMode' can only be 'flip' or 'dirty'.")
+
+        # Indexes the artwork tree once so lookups skip listing directories
+        res.loadManifest()
+
+        # Serves artwork from the prebuilt bundle if one exists (bundle.py)
+        bundleReport = res.loadBundle()
+        if bundleReport is not None:
+            print("Artwork bundle: {images} images ({stale} stale), mapped in "
+                  "{loadTime:.4f} s, {timeSaved:.4f} s of decoding saved."
+                  .format(**bundleReport))
+
+        # Packs the tiles and sprite frames into atlases on their first use
+        res.registerAtlases()
 
         # in-game classes & sprites initialization
         # self.player = sprites.Player(self.screen)
         self.menu = menu.Menu(self.screen)
         # self.level = levels.Level(self.screen, self.player)
 
+        # The menus have resolved their fonts by now, hence saved once here
+        res.saveFontCache()
+        print("Font lookup: {lookupTime:.4f} s, {hits} hits, {misses} misses."
+              .format(**res.getFontReport()))
+
 
     def eventHandle(self, event):
         """
@@ -47,12 +94,33 @@ class Game():
         meant to handle it.
         """
 
+        # Mouse positions are converted from the window to the screen drawn on
+        # (the texture renderer converts them itself)
+        if render.upscaler is not None:
+            if hasattr(event, "pos"):
+                event.pos = render.upscaler.toLogical(event.pos)
+            if hasattr(event, "rel"):
+                event.rel = render.upscaler.toLogicalMotion(event.rel)
+
+            if event.type == pygame.VIDEORESIZE:
+                render.upscaler.setWindow(pygame.display.get_surface())
+
         if event.type == pygame.QUIT:
             self.running = False
 
+        # The renderer's window is not the last one (see TextureRenderer)
+        if render.textureRenderer is not None:
+            if event.type == pygame.WINDOWCLOSE:
+                self.running = False
+
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
                 self.running = False
+
+        # The whole screen changes on these hence is redrawn in full
+        if event.type in (res.CHANGEMENU, res.CHANGELEVEL,
+                          pygame.VIDEORESIZE, pygame.VIDEOEXPOSE):
+            render.requestFullRedraw()
         #
         # if event.type == res.CHANGEPLAYER:
         #     self.player.currentState = self.player.state[event.state]
@@ -93,11 +161,23 @@ class Game():
             # self.level.currentLevel.update()
             # self.level.currentLevel.draw()
 
+            # The level updates the player along with its other sprites
             # self.player.currentState.clear()
-            # self.player.currentState.update()
             # self.player.currentState.draw()
 
-            pygame.display.flip()
+            if render.textureRenderer is not None:
+                render.textureRenderer.present(render.renderQueue)
+            elif render.dirtyRenderer is not None:
+                render.renderQueue.flush(self.screen)
+                render.dirtyRenderer.present()
+            else:
+                render.renderQueue.flush(self.screen)
+                render.updateDisplay()
+
+        # Includes the directories indexed (and fonts resolved) during play so
+        # the next start neither scans nor lists them
+        res.saveManifest()
+        res.saveFontCache()
 
 
 if __name__ == "__main__":
@@ -114,5 +194,4 @@ if __name__ == "__main__":
 # Start screen artwork
 # inGame sound effects
 # Main character vs background colour
-# inGame camera
 #
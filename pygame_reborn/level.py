@@ -5,6 +5,17 @@ import pygame
 import random
 import sprite
 import res
+import render
+import collision
+import physics
+import array
+from concurrent.futures import ThreadPoolExecutor
+
+# NumPy is optional: it only speeds up the generation of tile maps
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 
@@ -21,6 +32,9 @@ class Level():
     pygame cycle. As such, some methods are dummy methods.
     """
 
+    prefetcher = None   # set by the level manager once the level is built
+    camera = None       # set by the level manager once the level is built
+
     def __init__(self, screen, player):
         """
         Creates instantiated variables of all the levels that are in this file
@@ -45,25 +59,110 @@ class Level():
 
         self.currentLevel = self.state[0]  # Starting level = blankLevel
 
+        self.prefetcher = LevelPrefetcher(self.stateGenerator)
+        self.camera = render.Camera(self.screen.get_size())
+
 
     def changeState(self, stateNum):
         """
         Changes the state of the current level (i.e. changes levels).
         Checks whether the level has already been generated and if not,
-        generates the level.
+        generates the level. If the level's artwork is being prefetched, waits
+        for it so the level is built from loaded surfaces only. The camera is
+        then bounded to the new level (or dropped for the blank level).
         """
 
         if not isinstance(self.state[stateNum], self.stateGenerator[stateNum]):
+            self.prefetcher.wait(stateNum)
             self.currentLevel = self.stateGenerator[stateNum](self.screen,
                                                               self.player)
         else:
             self.currentLevel = self.state[stateNum]
 
+        self.currentLevel.prefetcher = self.prefetcher
+
+        if isinstance(self.currentLevel, BlankLevel):
+            render.renderQueue.camera = None
+        else:
+            # Levels smaller than the screen stay where they are drawn
+            self.camera.worldRect = self.currentLevel.structureRect.union(
+                self.screen.get_rect())
+
+            self.currentLevel.camera = self.camera
+            render.renderQueue.camera = self.camera
+
+
+    # Overridden by levels that have artwork worth prefetching
+    @staticmethod
+    def listArtwork():
+        """
+        Returns the artwork the level loads when it is built as a tuple of
+        (list of (dirPath, *searchQuery) queries, list of image paths).
+        """
+
+        return [], []
+
+
+    def prefetchNearbyLevels(self, prefetchRange=150):
+        """
+        Starts prefetching the level linked to any enabled door the player is
+        within 'prefetchRange' pixels of.
+        """
+
+        if self.prefetcher is None:
+            return
+
+        for door in self.doorDict.values():
+            if door.isDisabled or door.linkedToNode is None:
+                continue
+
+            stateType, stateNum = door.linkedToNode
+            doorRange = door.rect.inflate(2 * prefetchRange, 2 * prefetchRange)
+
+            if stateType == "Level" and doorRange.colliderect(self.player.rect):
+                self.prefetcher.prefetch(stateNum)
+
+
+    def updateCamera(self):
+        """
+        Scrolls the camera so that it follows the player.
+        """
+
+        if self.camera is not None:
+            self.camera.follow(self.player.rect)
+
+
+    def updateSprites(self, spritesList):
+        """
+        Updates the sprites that have a body in the physics world (e.g. the
+        player) in phases: the controls of every sprite (which submit their
+        bodies), a single step of the physics world for all of them, then the
+        motion of every sprite (collisions and moving their rects).
+        """
+
+        for spriteToUpdate in spritesList:
+            spriteToUpdate.updateControls()
+
+        physics.physicsWorld.step()
+
+        for spriteToUpdate in spritesList:
+            spriteToUpdate.updateMotion()
+
 
     def handleEvent(self, event):
         pass
 
 
+    def updateSpatialHash(self, event):
+        """
+        Moves the sprite of a MOVED event to its new rect in the spatial hash
+        of the level's sprites (which the sprites query for collisions).
+        """
+
+        if event.type == rsc.MOVED:
+            self.spatialHash.update(event.spriteName, event.spriteRect)
+
+
     def update(self):
         pass
 
@@ -82,16 +181,10 @@ class Level():
         The method must first be initialized via "initializeBackground".
         """
 
-        for _ in range(self.updateTileAmount):
-
-            x = random.randint(0, self.amountTilesx - 1) * self.tileWidth
-            y = random.randint(0, self.amountTilesy - 1) * self.tileHeight
-            coord = (x, y)
-
-            tileNum = random.randint(1, len(self.tileDict))
-            tile = self.tileDict[tileNum].convert()
-
-            self.backgroundSurface.blit(tile, coord)
+        for tileRect in self.tileMap.randomizeCells(self.updateTileAmount):
+            self.composeStructureLayer(tileRect)
+            render.invalidate(render.toScreen(
+                tileRect.move(self.backgroundRect.topleft)))
 
 
     def initializeUpdateBackground(self, tileAmount=1, tileDelay=0):
@@ -105,12 +198,14 @@ class Level():
         pygame.time.set_timer(rsc.BACKGROUNDUPDATE, tileDelay)
 
 
-    def initializeBackground(self, tileOffsetx=2, tileOffsety=2):
+    def initializeBackground(self, tileOffsetx=2, tileOffsety=2, screensx=1,
+                             screensy=1):
         """
         Draws an entire randomly generated tiles background onto a surface
-        and also initializes the rect of that background.  The last two
-        arguments refer to the amount of tiles to remove in each direction
-        respectively.
+        and also initializes the rect of that background (in world
+        coordinates). The tile offset arguments refer to the amount of tiles to
+        remove in each direction respectively while 'screensx' and 'screensy'
+        are the size of the level in screens (the camera scrolls over it).
         """
 
         self.tileDict = rsc.loadArtworkFrom(rsc.TILEARTS)
@@ -118,34 +213,28 @@ class Level():
         # All tiles have the same width & height
         self.tileWidth, self.tileHeight = self.tileDict[1].get_size()
 
-        self.amountTilesx = (self.screenWidth // self.tileWidth) - tileOffsetx
-        self.amountTilesy = (self.screenHeight // self.tileHeight) - tileOffsety
+        worldWidth = self.screenWidth * screensx
+        worldHeight = self.screenHeight * screensy
+
+        self.amountTilesx = (worldWidth // self.tileWidth) - tileOffsetx
+        self.amountTilesy = (worldHeight // self.tileHeight) - tileOffsety
 
         allTilesPixelx = self.amountTilesx * self.tileWidth
         allTilesPixely = self.amountTilesy * self.tileHeight
 
-        centerPixelOffsetx = (self.screenWidth - allTilesPixelx) / 2
-        centerPixelOffsety = (self.screenHeight - allTilesPixely) / 2
+        centerPixelOffsetx = (worldWidth - allTilesPixelx) / 2
+        centerPixelOffsety = (worldHeight - allTilesPixely) / 2
 
         self.backgroundOffsetx = centerPixelOffsetx
         self.backgroundOffsety = centerPixelOffsety
         self.backgroundWidth = allTilesPixelx
         self.backgroundHeight = allTilesPixely
 
-        self.backgroundSurface = pygame.Surface((self.backgroundWidth,
-                                                 self.backgroundHeight))
+        self.tileMap = TileMap(self.tileDict, self.amountTilesx,
+                               self.amountTilesy)
+        self.tileMap.generate()
 
-        for y in range(self.amountTilesy):
-            for x in range(self.amountTilesx):
-
-                coordx = x * self.tileWidth
-                coordy = y * self.tileHeight
-                coord = (coordx, coordy)
-
-                tileNum = random.randint(1, len(self.tileDict))
-                tile = self.tileDict[tileNum]
-
-                self.backgroundSurface.blit(tile, coord)
+        self.backgroundSurface = self.tileMap.surface
 
         self.backgroundRect = pygame.Rect(self.backgroundOffsetx,
                                           self.backgroundOffsety,
@@ -153,6 +242,270 @@ class Level():
                                           self.backgroundHeight)
 
 
+    def initializeStructureLayer(self, isAnimated=False):
+        """
+        Composites the background and the static structure of the level
+        (platforms and doors) once onto a layer surface, so that the level is
+        drawn with a single blit. The layer spans the background and anything
+        sticking out of it. If 'isAnimated' is True, the platforms are left out
+        of the layer and redrawn every frame with random tiles instead
+        (shimmer). The method must be called after the background, doors and
+        platforms are initialized.
+        """
+
+        self.isStructureAnimated = isAnimated
+
+        structureRectsList = [platform.rect for platform in
+                              self.platformRectsDict.values()]
+        structureRectsList += [door.rect for door in self.doorDict.values()]
+
+        self.structureRect = self.backgroundRect.unionall(structureRectsList)
+        self.structureSurface = pygame.Surface(self.structureRect.size)
+
+        self.composeStructureLayer()
+
+
+    def composeStructureLayer(self, area=None):
+        """
+        Redraws the structure layer from the background surface, either in
+        full or only over the area given (relative to the background).
+        """
+
+        offset = (-self.structureRect.x, -self.structureRect.y)
+
+        if area is not None:
+            area = pygame.Rect(area).move(self.backgroundRect.topleft)
+            area = area.move(offset)
+
+        # Everything that isn't within the background Surface area is black
+        self.structureSurface.set_clip(area)
+        self.structureSurface.fill((0, 0, 0))
+        self.structureSurface.blit(self.backgroundSurface,
+                                   self.backgroundRect.move(offset))
+
+        if not self.isStructureAnimated:
+            for platform in self.platformRectsDict.values():
+                platform.drawOnto(self.structureSurface, offset)
+
+        for door in self.doorDict.values():
+            self.structureSurface.blit(door.surface, door.rect.move(offset))
+
+        self.structureSurface.set_clip(None)
+
+
+    def initializeOccupancyGrid(self):
+        """
+        Compiles the platforms (the static solids of the level) into an
+        occupancy grid laid over the background in the platforms' tile units,
+        so that collisions against them are cell lookups. The method must be
+        called after the background and platforms are initialized.
+        """
+
+        if self.platformRectsDict:
+            platform = next(iter(self.platformRectsDict.values()))
+            cellWidth, cellHeight = platform.tileWidth, platform.tileHeight
+        else:
+            cellWidth, cellHeight = self.tileWidth, self.tileHeight
+
+        # Platforms are placed relative to the background's top-left
+        gridRect = self.backgroundRect.unionall(
+            [platform.rect for platform in self.platformRectsDict.values()])
+
+        self.occupancyGrid = collision.OccupancyGrid(gridRect, cellWidth,
+                                                     cellHeight)
+
+        for num, platform in sorted(self.platformRectsDict.items()):
+            self.occupancyGrid.addSolid("Platform" + str(num), platform.rect)
+
+
+    def invalidateStructure(self):
+        """
+        Recomposes the whole structure layer. Must be called whenever the
+        level geometry changes (e.g. a platform or door is added or moved).
+        """
+
+        self.composeStructureLayer()
+        render.invalidate(render.toScreen(self.structureRect))
+
+
+
+
+class TileMap():
+    """
+    A background made out of equally sized tiles. The tile of every cell is
+    stored as a tile id (the index of the tile) in a compact grid, one byte
+    per cell in row-major order, and the tiles are drawn onto a surface.
+    """
+
+    def __init__(self, tileDict, amountTilesx, amountTilesy):
+        """
+        Creates an empty grid of 'amountTilesx' by 'amountTilesy' cells and
+        converts the tiles of 'tileDict' (ordered by their keys) once to the
+        pixel format of the tile map's surface.
+        """
+
+        if not 0 < len(tileDict) <= 256:
+            raise levelError("A tile map needs between 1 and 256 tiles.")
+
+        # All tiles have the same width & height
+        self.tileWidth, self.tileHeight = tileDict[min(tileDict)].get_size()
+
+        self.amountTilesx = amountTilesx
+        self.amountTilesy = amountTilesy
+        self.cellAmount = amountTilesx * amountTilesy
+
+        self.grid = array.array("B", bytes(self.cellAmount))
+        self.surface = pygame.Surface((amountTilesx * self.tileWidth,
+                                       amountTilesy * self.tileHeight))
+
+        self.tileList = [tileDict[key].convert(self.surface)
+                         for key in sorted(tileDict)]
+
+
+    def generate(self):
+        """
+        Fills the whole grid with random tile ids and redraws the surface. If
+        NumPy is installed, both steps are vectorized: the pixels of the tiles
+        are gathered through the grid straight into the surface's pixels.
+        Otherwise the surface is redrawn with a single 'blits' call.
+        """
+
+        # 24 bit surfaces cannot be referenced as a 2D array of pixels
+        if numpy is None or self.surface.get_bytesize() == 3:
+            self.grid = array.array("B", random.choices(
+                range(len(self.tileList)), k=self.cellAmount))
+
+            self.surface.blits([(self.tileList[tileId],
+                                 self.getCellCoord(cell))
+                                for cell, tileId in enumerate(self.grid)],
+                               doreturn=False)
+            return
+
+        tileIds = numpy.random.randint(0, len(self.tileList),
+                                       (self.amountTilesy, self.amountTilesx),
+                                       dtype=numpy.uint8)
+        self.grid = array.array("B", tileIds.tobytes())
+
+        # Pixel arrays are indexed [x, y] while the grid is indexed [y, x]
+        tilePixels = numpy.stack([pygame.surfarray.array2d(tile)
+                                  for tile in self.tileList])
+        gridPixels = tilePixels[tileIds.T].transpose(0, 2, 1, 3)
+
+        surfacePixels = pygame.surfarray.pixels2d(self.surface)
+        surfacePixels[:] = gridPixels.reshape(surfacePixels.shape)
+        del surfacePixels   # unlocks the surface
+
+
+    def getCellCoord(self, cell):
+        """
+        Returns the pixel coordinate (on the surface) of the top-left of the
+        cell with the given index.
+        """
+
+        y, x = divmod(cell, self.amountTilesx)
+
+        return (x * self.tileWidth, y * self.tileHeight)
+
+
+    def getTileId(self, x, y):
+        """
+        Returns the tile id of the cell in column x and row y.
+        """
+
+        return self.grid[y * self.amountTilesx + x]
+
+
+    def setCells(self, cellDict):
+        """
+        Sets the tile ids of the cells in 'cellDict' (a dictionary of cell
+        indices and tile ids) and redraws only those cells with a single
+        'blits' call. Returns the list of rects of the cells redrawn.
+        """
+
+        for cell, tileId in cellDict.items():
+            self.grid[cell] = tileId
+
+        return self.surface.blits([(self.tileList[tileId],
+                                    self.getCellCoord(cell))
+                                   for cell, tileId in cellDict.items()])
+
+
+    def randomizeCells(self, amount):
+        """
+        Sets 'amount' random cells to random tile ids. Returns the list of
+        rects of the cells redrawn.
+        """
+
+        cellList = random.choices(range(self.cellAmount), k=amount)
+        tileIdList = random.choices(range(len(self.tileList)), k=amount)
+
+        return self.setCells(dict(zip(cellList, tileIdList)))
+
+
+
+
+class LevelPrefetcher():
+    """
+    Loads the artwork of a level on a worker thread before the level is
+    entered so that building it later only uses cached surfaces (converted
+    once the level waits for it, see 'wait').
+    """
+
+    def __init__(self, stateGenerator):
+        """
+        'stateGenerator' is the level manager's dictionary of state numbers
+        and their level classes.
+        """
+
+        self.stateGenerator = stateGenerator
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.futureDict = {}
+
+
+    def prefetch(self, stateNum):
+        """
+        Starts loading the artwork of the level of the given state number
+        unless it has been started already.
+        """
+
+        levelClass = self.stateGenerator.get(stateNum)
+
+        if levelClass is not None and stateNum not in self.futureDict:
+            self.futureDict[stateNum] = self.executor.submit(
+                self.loadArtwork, levelClass)
+
+
+    def loadArtwork(self, levelClass):
+        """
+        Loads the artwork listed by the level class into the artwork cache
+        (runs on the worker thread).
+        """
+
+        queryList, imagePathsList = levelClass.listArtwork()
+
+        rsc.loadArtworksFrom(queryList)
+        for imagePath in imagePathsList:
+            rsc.loadImage(imagePath)
+
+
+    def wait(self, stateNum):
+        """
+        Blocks until the prefetch of the given state number (if any) is done
+        then converts the prefetched artwork (on the calling, main thread).
+        Errors raised while prefetching are ignored as the level will load
+        (and report) the artwork itself.
+        """
+
+        future = self.futureDict.get(stateNum)
+
+        if future is not None:
+            try:
+                future.result()
+            except (OSError, pygame.error):
+                del self.futureDict[stateNum]
+
+            rsc.convertPendingImages()
+
 
 
 # Only used to control flow of logic in main game file
@@ -182,14 +535,32 @@ class MainLevel(Level):
         self.screen = screen
         self.screenWidth, self.screenHeight = self.screen.get_size()
 
-        self.initializeBackground()
+        self.platformRectsDict = {}
+        self.spatialHash = collision.SpatialHash()
+
+        # Laid out over 1024x768 pixels, two logical screens each way (the
+        # camera scrolls over it)
+        self.initializeBackground(screensx=2, screensy=2)
         self.initializeUpdateBackground(tileAmount=10, tileDelay=1000)
         self.initializeDoors()
+        self.initializeStructureLayer()
+        self.initializeOccupancyGrid()
 
         self.player = player
         self.player.currentState = self.player.state[1]     # spawns player
         self.player.rect.center = (200, 200)     # spawn location
-        self.player.initalize(areaBounded=self.backgroundRect)
+        self.player.initalize(areaBounded=self.backgroundRect,
+                              spatialHash=self.spatialHash,
+                              occupancyGrid=self.occupancyGrid)
+
+
+    @staticmethod
+    def listArtwork():
+        """
+        Returns the artwork loaded when the main level is built.
+        """
+
+        return [(rsc.TILEARTS,)], [rsc.DOORART]
 
 
     def handleEvent(self, event):
@@ -197,8 +568,11 @@ class MainLevel(Level):
         When a UPDATEBACKGROUND event is caught, then the updateBackground()
         function is called. Also, when the player is near a door and presses
         the enter key (triggering a key event), the player transitions levels.
+        MOVED events update the spatial hash of the level's sprites.
         """
 
+        self.updateSpatialHash(event)
+
         if event.type == rsc.BACKGROUNDUPDATE:
             self.updateBackground()
 
@@ -211,26 +585,38 @@ class MainLevel(Level):
                         self.player.rect.center = door.spawnPlayerLocation
 
 
+    def update(self):
+        """
+        Updates the player, scrolls the camera and prefetches the levels behind
+        the doors the player approaches.
+        """
+
+        self.updateSprites([self.player.currentState])
+        self.updateCamera()
+        self.prefetchNearbyLevels()
+
+
     def draw(self):
         """
-        Draws the background surface and doors of the level onto the screen.
+        Draws the structure layer (background and doors) onto the screen.
         """
 
         # Everything that isn't within the background Surface area is black
-        self.screen.fill((0, 0, 0))
-        self.screen.blit(self.backgroundSurface, self.backgroundRect)
-
-        for door in self.doorDict.values():
-            door.draw(self.screen)
+        # (only drawn in full when the whole screen is redrawn)
+        if render.isFullRedraw():
+            self.screen.fill((0, 0, 0))
+            self.screen.blit(self.structureSurface,
+                             render.toScreen(self.structureRect))
 
 
     def clear(self):
         """
-        Clears the current background by drawing the background surface only
-        (which is constantly changing) onto the screen.
+        Clears the current background by drawing the structure layer (which
+        is constantly changing along with the background) onto the screen.
         """
 
-        self.screen.blit(self.backgroundSurface, self.backgroundRect)
+        render.restoreBackground(self.screen, self.structureSurface,
+                                 render.toScreen(self.structureRect).topleft)
 
 
     def initializeDoors(self, doorSpacing=20):
@@ -268,24 +654,43 @@ class Level01(Level):
     The first level of the game.
     """
 
+    isShimmering = False    # redraws the platforms with random tiles per frame
+
     def __init__(self, screen, player):
         """
         """
         self.platformRectsDict = {}
+        self.spatialHash = collision.SpatialHash()
 
         self.screen = screen
         self.screenWidth, self.screenHeight = self.screen.get_size()
 
-        self.initializeBackground()
+        # Laid out over 1024x768 pixels, two logical screens each way (the
+        # camera scrolls over it)
+        self.initializeBackground(screensx=2, screensy=2)
         self.initializeUpdateBackground(tileAmount=10, tileDelay=1000)
         self.initializeDoors()
         self.initializePlatforms()
+        self.initializeStructureLayer(isAnimated=self.isShimmering)
+        self.initializeOccupancyGrid()
         self.initializeEnemies()
 
         self.player = player
         self.player.currentState = self.player.state[1]     # spawns player
         self.player.rect.center = (100, 100)     # spawn location
-        self.player.initalize(areaBounded=self.backgroundRect)
+        self.player.initalize(areaBounded=self.backgroundRect,
+                              spatialHash=self.spatialHash,
+                              occupancyGrid=self.occupancyGrid)
+
+
+    @staticmethod
+    def listArtwork():
+        """
+        Returns the artwork loaded when the first level is built.
+        """
+
+        return ([(rsc.TILEARTS,), (rsc.STRUCTURETILEARTS,)],
+                [rsc.DOORART, rsc.ENEMYART1, rsc.ENEMYART2])
 
 
     def handleEvent(self, event):
@@ -293,8 +698,11 @@ class Level01(Level):
         When a UPDATEBACKGROUND event is caught, then the updateBackground()
         function is called. Also, when the player is near a door and presses
         the enter key (triggering a key event), the player transitions levels.
+        MOVED events update the spatial hash of the level's sprites.
         """
 
+        self.updateSpatialHash(event)
+
         for enemy in self.enemiesDict.values():
             enemy.handleEvent(event)
 
@@ -312,42 +720,52 @@ class Level01(Level):
 
     def update(self):
         """
-        Updates the sprites in the level (in this case enemies).
+        Updates the sprites in the level (in this case enemies and the player)
+        and scrolls the camera.
         """
 
         for enemy in self.enemiesDict.values():
             enemy.update()
 
+        self.updateSprites([self.player.currentState])
+        self.updateCamera()
+        self.prefetchNearbyLevels()
+
 
     def draw(self):
         """
-        Draws the background surface and doors of the level onto the screen.
+        Draws the structure layer (background, platforms and doors) and the
+        enemies of the level onto the screen.
         """
 
         # Everything that isn't within the background Surface area is black
-        self.screen.fill((0, 0, 0))
-        self.screen.blit(self.backgroundSurface, self.backgroundRect)
-        self.drawLevelStructure()
+        # (only drawn in full when the whole screen is redrawn)
+        if render.isFullRedraw():
+            self.screen.fill((0, 0, 0))
+            self.screen.blit(self.structureSurface,
+                             render.toScreen(self.structureRect))
+
+        if self.isStructureAnimated:
+            self.drawLevelStructure()
 
         for enemy in self.enemiesDict.values():
             enemy.draw()
 
-        for door in self.doorDict.values():
-            door.draw(self.screen)
-
 
     def clear(self):
         """
-        Clears the current background by drawing the background surface only
-        (which is constantly changing) onto the screen.
+        Clears the current background by drawing the structure layer (which
+        is constantly changing along with the background) onto the screen.
         """
 
-        self.screen.blit(self.backgroundSurface, self.backgroundRect)
+        render.restoreBackground(self.screen, self.structureSurface,
+                                 render.toScreen(self.structureRect).topleft)
 
 
     def drawLevelStructure(self):
         """
-        Draws the platforms in the level.
+        Draws the platforms in the level with random tiles (only used when
+        the platforms shimmer, otherwise they are part of the structure layer).
         """
 
         for platform in self.platformRectsDict.values():
@@ -391,7 +809,6 @@ class Level01(Level):
 
                 platform = Platform(self.screen, self.backgroundRect,
                                     2, 1, 2 + 4*i, 5*j)
-                rsc.triggerMoveEvent("Platform" + str(num), platform.rect)
 
                 self.platformRectsDict[num] = platform
 
@@ -402,12 +819,18 @@ class Level01(Level):
         """
         self.enemiesDict = {}
 
-        self.enemiesDict[1] = sprites.Enemy(self.screen, 300, 205)
-        self.enemiesDict[2] = sprites.Enemy(self.screen, 300, 385)
-        self.enemiesDict[3] = sprites.Enemy(self.screen, 445, 565)
-        self.enemiesDict[4] = sprites.Enemy(self.screen, 590, 205)
-        self.enemiesDict[5] = sprites.Enemy(self.screen, 590, 565)
-        self.enemiesDict[6] = sprites.Enemy(self.screen, 878, 565)
+        self.enemiesDict[1] = sprites.Enemy(self.screen, 300, 205,
+                                            self.spatialHash)
+        self.enemiesDict[2] = sprites.Enemy(self.screen, 300, 385,
+                                            self.spatialHash)
+        self.enemiesDict[3] = sprites.Enemy(self.screen, 445, 565,
+                                            self.spatialHash)
+        self.enemiesDict[4] = sprites.Enemy(self.screen, 590, 205,
+                                            self.spatialHash)
+        self.enemiesDict[5] = sprites.Enemy(self.screen, 590, 565,
+                                            self.spatialHash)
+        self.enemiesDict[6] = sprites.Enemy(self.screen, 878, 565,
+                                            self.spatialHash)
 
 
 
@@ -446,23 +869,47 @@ class Platform():
                                 self.originy + y * self.tileHeight,
                                 widthPixel, heightPixel)
 
+        # The tiles of the platform are picked once, unless it shimmers
+        self.tileNumList = [random.randint(1, len(self.structureTileDict))
+                            for _ in range(width * height)]
 
-    def draw(self):
+
+    def getTileCoords(self, offset=(0, 0)):
+        """
+        Returns the screen coordinates (moved by offset) of every tile of the
+        platform in the same order as the tile numbers.
+        """
+
+        return [(self.originx + (col + self.x) * self.tileWidth + offset[0],
+                 self.originy + (row + self.y) * self.tileHeight + offset[1])
+                for col in range(self.width) for row in range(self.height)]
+
+
+    def drawOnto(self, surface, offset=(0, 0)):
         """
-        Draws a platform sprite. It is generated via blitting mulitple single
-        tiles.
+        Draws the platform with its fixed tiles onto the surface given (e.g.
+        the level's structure layer), moved by offset.
         """
 
-        for col in range(self.width):
-            for row in range(self.height):
+        surface.blits([(self.structureTileDict[tileNum], coord)
+                       for tileNum, coord in zip(self.tileNumList,
+                                                 self.getTileCoords(offset))],
+                      doreturn=False)
+
 
-                xblock = self.originx + (col + self.x) * self.tileWidth
-                yblock = self.originy + (row + self.y) * self.tileHeight
+    def draw(self):
+        """
+        Draws a shimmering platform sprite, i.e. with random tiles every frame.
+        It is generated via blitting mulitple single tiles.
+        """
 
-                tileNum = random.randint(1, len(self.structureTileDict))
-                tile = self.structureTileDict[tileNum].convert()
+        tileNumList = [random.randint(1, len(self.structureTileDict))
+                       for _ in range(self.width * self.height)]
 
-                self.screen.blit(tile, (xblock, yblock))
+        for tileNum, coord in zip(tileNumList, self.getTileCoords()):
+            render.renderQueue.submitWorld(render.STRUCTURELAYER,
+                                           self.structureTileDict[tileNum],
+                                           coord)
 
 
 
@@ -501,7 +948,7 @@ class Door():
         self.isDisabled = isDisabled
         self.alphaColour = alphaColour
 
-        self.surface = pygame.image.load(rsc.DOORART).convert()
+        self.surface = rsc.loadImage(rsc.DOORART).convert()
         self.rect = self.surface.get_rect()
 
         # Sets the top-left pixel of the door as the transparent colour
@@ -516,4 +963,5 @@ class Door():
         Draws the door onto the screen.
         """
 
-        screen.blit(self.surface, self.rect)
+        render.renderQueue.submitWorld(render.STRUCTURELAYER, self.surface,
+                                       self.rect.copy())
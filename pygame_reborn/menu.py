@@ -7,9 +7,10 @@
 ###
 
 import pygame
-import time
 import random
 import res
+import render
+import timeline
 
 
 class Background():
@@ -58,8 +59,9 @@ class Background():
         *tile is of form "colour", "number" (following the naming convention
         of the file names).
         """
-        self.screen.blit(self.tileDict[tile],
-                         (coord[0]*self.tileWidth, coord[1]*self.tileHeight))
+        render.renderQueue.submit(render.BACKGROUNDLAYER, self.tileDict[tile],
+                                  (coord[0]*self.tileWidth,
+                                   coord[1]*self.tileHeight))
 
 
     def drawRandomTile(self, coord=None, colour=None):
@@ -199,70 +201,69 @@ class SplashMenu(Menu):
         self.tileDict = res.loadArtworkFrom(res.ART_MISC, "tile")
         self.drawTileList = []
 
-        self.isEffectOne = False
-        self.isEffectTwo = False
-        self.isEffectThree = False
-
         # To draw the blue background & the red/black emblem symbol
         self.initializeEffectOne()
         self.initializeEffectTwo()
         self.initializeEffectThree()
+        self.initializeTimeline()
 
 
     def update(self):
         """
-        The core logic of how the two effects are executed.
-        X ---> Y
-        This method updates the effect being executed.
+        The core logic of how the three effects are executed.
+        blue background ---> red emblem ---> black emblem
+        This method plays the effects' timeline up to the current frame.
         """
 
-        data1 = ("blue", 5, self.blueCoordItr)
-        data2 = ("red", 1, self.redCoordItr)
-        data3 = ("black", 1, self.blackCoordItr)
-
-
-        if self.updateEffect(*data1):
-            self.isEffectOne = True
-
-        elif self.updateEffect(*data2):
-            self.isEffectTwo = True
-
-        elif self.updateEffect(*data3):
-            self.isEffectThree = True
+        del self.drawTileList[:]
 
+        self.timeline.update()
 
 
-    def updateEffect(self, tileColour, drawTileRate, tileCoordItr):
+    def updateEffect(self, tileColour, drawTileRate, tileCoordItr,
+                     isRandomTile=False):
         """
-
+        Queues the next 'drawTileRate' tiles of the effect to be drawn this
+        frame. Returns False once the effect has no tiles left (which ends its
+        step on the timeline).
         """
 
-        del self.drawTileList[:]
-
-        time.sleep(0.035)
-
         try:
             for _ in range(drawTileRate):
-                data = (next(tileCoordItr), tileColour)
+                data = (next(tileCoordItr), tileColour, isRandomTile)
                 self.drawTileList.append(data)
             return True
         except StopIteration:
             return False
 
 
-
     def draw(self):
         """
-        Draws either a slideShowEffect or a flashEffect on the screen
-        specified by effectNum
+        Draws the tiles of the effects that were due this frame.
         """
 
-        for tileData in self.drawTileList:
-            if self.isEffectOne:
-                self.background.drawRandomTile(*tileData)
+        for coord, tileColour, isRandomTile in self.drawTileList:
+            if isRandomTile:
+                self.background.drawRandomTile(coord, tileColour)
+            else:
+                self.background.drawTileAt(coord, tileColour, "01")
+
 
-            if self.isEffectTwo or self.isEffectThree:
-                self.background.drawTileAt(tileData[0], tileData[1], "01")
+    def initializeTimeline(self, tileDelay=35):
+        """
+        Schedules the effects one after another on a timeline. Every
+        'tileDelay' milliseconds, the next few tiles of the current effect are
+        drawn.
+        """
+
+        self.timeline = timeline.Timeline()
+
+        self.timeline.every(tileDelay, self.updateEffect, "blue", 5,
+                            self.blueCoordItr, True)
+        self.timeline.every(tileDelay, self.updateEffect, "red", 1,
+                            self.redCoordItr)
+        self.timeline.every(tileDelay, self.updateEffect, "black", 1,
+                            self.blackCoordItr)
 
 
 
@@ -598,7 +599,7 @@ class MainMenu(Menu):
         Draws only the background onto the screen (does not draw buttons)
         """
 
-        self.screen.blit(self.background, (0,0))
+        render.restoreBackground(self.screen, self.background, (0,0))
 
 
     def initializeButtons(self):
@@ -640,7 +641,7 @@ class MainMenu(Menu):
         # Causes first non-title button to be highlighted (displays an arrow)
         self.buttonsDict[1].isHighlighted = True
 
-        self.initializeCoords(amount=len(self.buttonsDict), spacing=80)
+        self.initializeCoords(amount=len(self.buttonsDict), spacing=40)
 
 
     def initializeCoords(self, amount, offsetx=0, offsety=0, spacing=50):
@@ -662,7 +663,7 @@ class MainMenu(Menu):
             self.coordsList.append(coord)
 
         # Title text has a different layout
-        self.coordsList[0] = (screenWidth/2, 120)
+        self.coordsList[0] = (screenWidth/2, screenHeight/6.4)
 
 
 class ExitMenu(Menu):
@@ -746,14 +747,20 @@ class Button():
         self.linkedToState = linkedToState
 
         # Merges text formatting information into a single font object
-        self.buttonFont = pygame.font.SysFont(self.textFont, self.textFontSize,
-                                              self.textBold, self.textItalic)
-
-        # Converts 'buttonFont' into a surface
-        self.buttonSurface = self.buttonFont.render(self.text,
-                                                    self.textAA,
-                                                    self.textColour,
-                                                    self.backgroundColour)
+        self.buttonFont = render.textRenderer.getFont(self.textFont,
+                                                      self.textFontSize,
+                                                      self.textBold,
+                                                      self.textItalic)
+
+        # Converts the text into a surface (shared hence converted to a copy)
+        self.buttonSurface = render.textRenderer.render(self.text,
+                                                        self.textFont,
+                                                        self.textFontSize,
+                                                        self.textBold,
+                                                        self.textItalic,
+                                                        self.textColour,
+                                                        self.textAA,
+                                                        self.backgroundColour)
         self.buttonSurface = self.buttonSurface.convert()
         self.buttonRect = self.buttonSurface.get_rect()
 
@@ -768,12 +775,15 @@ class Button():
         if center:
             x, y = coord
             self.buttonRect.center = (x, y)
-            self.screen.blit(self.buttonSurface, self.buttonRect)
         else:
-            self.buttonRect = self.screen.blit(self.buttonSurface, coord)
+            self.buttonRect.topleft = coord
+
+        render.renderQueue.submit(render.MENULAYER, self.buttonSurface,
+                                  self.buttonRect.copy())
 
         if self.highlightEnabled and self.isHighlighted:
-            self.drawHighlight(offset=-20)
+            self.drawHighlight(offset=-20 * self.textFontSize //
+                               res.ARROWFONTSIZE)
 
 
     def drawHighlight(self, offset=0):
@@ -789,19 +799,25 @@ class Button():
 
         self.highlightedRect.center = (highlightedCoordx, highlightedCoordy)
 
-        self.screen.blit(self.highlightedSurface, self.highlightedRect)
+        render.renderQueue.submit(render.MENULAYER, self.highlightedSurface,
+                                  self.highlightedRect.copy())
 
 
     def initializeHighlightSurface(self):
         """
-        Loads an image for the highlight effect and sets the color of
-        the top-left corner of that image to the transparent colour (alpha
-        colour)
+        Loads an image for the highlight effect (scaled to the size of the
+        text) and sets the color of the top-left corner of that image to the
+        transparent colour (alpha colour)
         """
 
         artwork = res.loadArtworkFrom(res.ART_MENU, "arrow")
 
-        self.highlightedSurface = artwork["01"].convert()
+        arrowWidth, arrowHeight = artwork["01"].get_size()
+        arrowSize = (arrowWidth * self.textFontSize // res.ARROWFONTSIZE,
+                     arrowHeight * self.textFontSize // res.ARROWFONTSIZE)
+
+        self.highlightedSurface = pygame.transform.scale(artwork["01"],
+                                                         arrowSize).convert()
         self.highlightedRect = self.highlightedSurface.get_rect()
 
         color = self.highlightedSurface.get_at((0,0))
@@ -0,0 +1,297 @@
+### The module that contains the physics world: the kinematics (displacement,
+### velocity, acceleration and flags) of every body stored as arrays, one per
+### field, and stepped all at once (gravity, friction, velocity, terminal
+### velocity and displacement) instead of one sprite at a time.
+
+import array
+import math
+import weakref
+
+# NumPy is optional: it only vectorizes the step of the physics world
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# The fields of a body (see 'bodyProperty')
+FLOATFIELDS = ("dx", "dy", "vx", "vy", "ax", "ay", "gForce",
+               "coefficientFriction", "terminalVelocity", "timeStep")
+FLAGFIELDS = ("disableGravity", "disableFriction", "overrideDisplacement")
+
+# Fewer bodies are stepped one at a time (the vectorized pass costs more than
+# it saves below that)
+VECTORIZEDBATCH = 32
+
+
+
+class PhysicsWorld():
+    """
+    Stores the bodies of the game as a struct of arrays: every field (e.g. the
+    x velocity) is a contiguous array indexed by body id. Bodies submitted
+    during a tick (see 'submit') are stepped together by 'step', with a single
+    vectorized pass over the arrays if NumPy is installed and enough bodies
+    were submitted, otherwise one body at a time.
+
+    The arrays are 'array.array's, which hand out plain Python numbers when a
+    single field of a body is read or written (e.g. by 'bodyProperty'). The
+    vectorized pass goes through NumPy views sharing their memory.
+
+    A tick of a level with many bodies hence runs the controls of every body
+    (which set forces and submit it), steps the world once, then runs the
+    motion of every body (collisions and moving its rect).
+    """
+
+    def __init__(self, capacity=64):
+        """
+        Initializes an empty world with room for 'capacity' bodies (the arrays
+        grow as bodies are added).
+        """
+
+        self.capacity = 0
+        self.fieldsDict = {}
+        self.viewsDict = {}     # field: NumPy view of its array
+        self.freeIdsList = []
+        self.bodyAmount = 0
+
+        self.submittedList = []
+        self.isSubmitted = bytearray()
+
+        self.grow(capacity)
+
+
+    def grow(self, capacity):
+        """
+        Enlarges every array of the world to 'capacity' bodies.
+        """
+
+        extraAmount = capacity - self.capacity
+
+        # An array can't be resized while a view of its memory exists
+        self.viewsDict = {}
+
+        for field in FLOATFIELDS + FLAGFIELDS:
+            typecode = "d" if field in FLOATFIELDS else "B"
+            self.fieldsDict.setdefault(field, array.array(typecode))
+            self.fieldsDict[field].extend(bytes(extraAmount))
+
+            if numpy is not None:
+                dtype = float if field in FLOATFIELDS else bool
+                self.viewsDict[field] = numpy.frombuffer(
+                    self.fieldsDict[field], dtype=dtype)
+
+        self.isSubmitted.extend(bytes(extraAmount))
+        self.freeIdsList.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+
+    def addBody(self, owner=None):
+        """
+        Adds a body with every field zeroed and returns its id. If an owner is
+        given (e.g. a sprite), the body is removed once the owner is garbage
+        collected.
+        """
+
+        if not self.freeIdsList:
+            self.grow(self.capacity * 2)
+
+        bodyId = self.freeIdsList.pop()
+        self.bodyAmount += 1
+
+        if owner is not None:
+            weakref.finalize(owner, self.removeBody, bodyId)
+
+        return bodyId
+
+
+    def removeBody(self, bodyId):
+        """
+        Removes the body, zeroing its fields so that its id can be reused.
+        """
+
+        for field in FLOATFIELDS + FLAGFIELDS:
+            self.fieldsDict[field][bodyId] = 0
+
+        if self.isSubmitted[bodyId]:
+            self.submittedList.remove(bodyId)
+            self.isSubmitted[bodyId] = False
+
+        self.freeIdsList.append(bodyId)
+        self.bodyAmount -= 1
+
+
+    def getField(self, field, bodyId):
+        """
+        Returns the value of the field of the body.
+        """
+
+        value = self.fieldsDict[field][bodyId]
+
+        if field in FLAGFIELDS:
+            return bool(value)
+        return float(value)
+
+
+    def setField(self, field, bodyId, value):
+        """
+        Sets the value of the field of the body.
+        """
+
+        self.fieldsDict[field][bodyId] = value
+
+
+    def submit(self, bodyId):
+        """
+        Queues the body to be stepped by the next 'step' (once per step).
+        """
+
+        if not self.isSubmitted[bodyId]:
+            self.isSubmitted[bodyId] = True
+            self.submittedList.append(bodyId)
+
+
+    def step(self):
+        """
+        Steps every body submitted since the previous step: applies gravity and
+        friction (unless disabled for this step), calculates the velocity
+        (v = u + at) bounded by the terminal velocity, then the displacement
+        (s = ut + 0.5at^2, unless overridden for this step). The disable and
+        override flags are reset for the next step.
+        """
+
+        if not self.submittedList:
+            return
+
+        if numpy is not None and len(self.submittedList) >= VECTORIZEDBATCH:
+            self.stepArrays(numpy.array(self.submittedList, dtype=numpy.intp))
+        else:
+            for bodyId in self.submittedList:
+                self.stepBody(bodyId)
+
+        for bodyId in self.submittedList:
+            self.isSubmitted[bodyId] = False
+        self.submittedList = []
+
+
+    def stepArrays(self, ids):
+        """
+        Steps the bodies of the ids given in a single vectorized pass (see
+        'step').
+        """
+
+        fieldsDict = self.viewsDict
+        dx, dy = fieldsDict["dx"][ids], fieldsDict["dy"][ids]
+        vx, vy = fieldsDict["vx"][ids], fieldsDict["vy"][ids]
+        ax, ay = fieldsDict["ax"][ids], fieldsDict["ay"][ids]
+        timeStep = fieldsDict["timeStep"][ids]
+        friction = fieldsDict["coefficientFriction"][ids]
+        terminalVelocity = fieldsDict["terminalVelocity"][ids]
+
+        # Gravity
+        isGravity = ~fieldsDict["disableGravity"][ids]
+        ay = numpy.where(isGravity, ay + fieldsDict["gForce"][ids], ay)
+
+        # Friction halts the body completely otherwise the velocity would be
+        # just very small but non-zero
+        isFriction = ~fieldsDict["disableFriction"][ids]
+        velocitiesList = []
+
+        for velocity in (vx, vy):
+            isHalted = numpy.abs(velocity) - friction < friction
+            slowed = velocity - numpy.sign(velocity) * friction
+
+            velocity = numpy.where(isFriction,
+                                   numpy.where(isHalted, 0.0, slowed),
+                                   velocity)
+            velocitiesList.append(velocity)
+
+        vx, vy = velocitiesList
+
+        # v = u + at, bounded by the terminal velocity
+        vx = numpy.clip(vx + ax * timeStep, -terminalVelocity, terminalVelocity)
+        vy = numpy.clip(vy + ay * timeStep, -terminalVelocity, terminalVelocity)
+
+        # s = ut + 0.5at^2
+        isOverridden = fieldsDict["overrideDisplacement"][ids]
+        dx = numpy.where(isOverridden, dx,
+                         (vx * timeStep) + 0.5 * ax * (timeStep ** 2))
+        dy = numpy.where(isOverridden, dy,
+                         (vy * timeStep) + 0.5 * ay * (timeStep ** 2))
+
+        fieldsDict["dx"][ids], fieldsDict["dy"][ids] = dx, dy
+        fieldsDict["vx"][ids], fieldsDict["vy"][ids] = vx, vy
+        fieldsDict["ay"][ids] = ay
+
+        for field in FLAGFIELDS:
+            fieldsDict[field][ids] = False
+
+
+    def stepBody(self, bodyId):
+        """
+        Steps a single body (see 'step'), used when NumPy isn't installed or
+        only a few bodies were submitted.
+        """
+
+        fieldsDict = self.fieldsDict
+        timeStep = fieldsDict["timeStep"][bodyId]
+        friction = fieldsDict["coefficientFriction"][bodyId]
+        terminalVelocity = fieldsDict["terminalVelocity"][bodyId]
+        ax = fieldsDict["ax"][bodyId]
+        ay = fieldsDict["ay"][bodyId]
+
+        if not fieldsDict["disableGravity"][bodyId]:
+            ay += fieldsDict["gForce"][bodyId]
+            fieldsDict["ay"][bodyId] = ay
+
+        for velocityField, acceleration in (("vx", ax), ("vy", ay)):
+            velocity = fieldsDict[velocityField][bodyId]
+
+            if not fieldsDict["disableFriction"][bodyId]:
+                if math.fabs(velocity) - friction < friction:
+                    velocity = 0
+                elif velocity > 0:
+                    velocity -= friction
+                elif velocity < 0:
+                    velocity += friction
+
+            # v = u + at, bounded by the terminal velocity
+            velocity = velocity + acceleration * timeStep
+            velocity = max(min(velocity, terminalVelocity), -terminalVelocity)
+
+            fieldsDict[velocityField][bodyId] = velocity
+
+        # s = ut + 0.5at^2
+        if not fieldsDict["overrideDisplacement"][bodyId]:
+            fieldsDict["dx"][bodyId] = (fieldsDict["vx"][bodyId] * timeStep) + \
+                                       0.5 * ax * (timeStep ** 2)
+            fieldsDict["dy"][bodyId] = (fieldsDict["vy"][bodyId] * timeStep) + \
+                                       0.5 * ay * (timeStep ** 2)
+
+        for field in FLAGFIELDS:
+            fieldsDict[field][bodyId] = False
+
+
+
+def bodyProperty(field):
+    """
+    Returns a property that reads and writes the field of the body of its
+    object (the body 'self.bodyId' of 'self.physicsWorld'), so that objects
+    such as sprites are thin views into the physics world. The arrays are
+    indexed directly as sprites read and write their fields many times a tick.
+    """
+
+    if field in FLAGFIELDS:
+        def getField(self):
+            return bool(self.physicsWorld.fieldsDict[field][self.bodyId])
+    else:
+        def getField(self):
+            return self.physicsWorld.fieldsDict[field][self.bodyId]
+
+    def setField(self, value):
+        self.physicsWorld.fieldsDict[field][self.bodyId] = value
+
+    return property(getField, setField)
+
+
+# The world shared by every sprite
+physicsWorld = PhysicsWorld()
@@ -0,0 +1,1020 @@
+### The module that contains the renderers: text rendering (menu buttons, HUD,
+### dialogues) through a shared cache so text is only rasterized once, the
+### render queue that batches the blits of a frame by layer, the camera that
+### maps the world onto the screen, the dirty rectangle renderer, the
+### upscaler that presents the fixed resolution screen on the window and the
+### SDL2 texture renderer (an alternative to presenting software surfaces).
+
+import pygame
+import res
+import weakref
+from collections import OrderedDict
+
+# The texture renderer needs pygame 2 (SDL2), the rest works without it
+try:
+    from pygame._sdl2 import video
+except ImportError:
+    video = None
+
+
+# Layers of the render queue, drawn from the lowest to the highest
+BACKGROUNDLAYER = 0
+STRUCTURELAYER = 1
+SPRITELAYER = 2
+PROJECTILELAYER = 3
+MENULAYER = 4
+
+
+
+class TextRenderer():
+    """
+    Renders text surfaces and keeps them keyed by
+    (text, font, size, bold, italic, colour, antiAliasing, backgroundColour).
+    The least recently used surfaces are evicted once the stored surfaces
+    exceed 'byteBudget'. Strings that change every frame (e.g. a score or an
+    FPS counter) are better drawn through 'drawGlyphs' which reuses one cached
+    surface per character.
+    """
+
+    def __init__(self, byteBudget=4 * 1024 * 1024):
+        """
+        'byteBudget' is the maximum amount of pixel memory (in bytes) held by
+        the cached surfaces.
+        """
+
+        self.byteBudget = byteBudget
+        self.bytesUsed = 0
+
+        self.fontDict = {}
+        self.surfaceDict = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+
+    def getFont(self, font, size, bold=False, italic=False):
+        """
+        Returns the font object of the given style, opening it only once.
+        """
+
+        key = (font, size, bold, italic)
+
+        if key not in self.fontDict:
+            self.fontDict[key] = res.loadFont(font, size, bold, italic)
+
+        return self.fontDict[key]
+
+
+    def render(self, text, font="monospace", size=12, bold=False,
+               italic=False, colour=(255, 255, 255), antiAliasing=False,
+               backgroundColour=None):
+        """
+        Returns the surface of the rendered text, rasterizing it only if it
+        is not cached. The surface is shared hence should be copied (e.g. via
+        '.convert()') before being modified.
+        """
+
+        key = (text, font, size, bold, italic, tuple(colour), antiAliasing,
+               backgroundColour and tuple(backgroundColour))
+
+        if key in self.surfaceDict:
+            self.hits += 1
+            self.surfaceDict.move_to_end(key)
+            return self.surfaceDict[key]
+
+        self.misses += 1
+
+        fontObject = self.getFont(font, size, bold, italic)
+        surface = fontObject.render(text, antiAliasing, colour,
+                                    backgroundColour)
+
+        self.surfaceDict[key] = surface
+        self.bytesUsed += self.getSurfaceBytes(surface)
+        self.evict()
+
+        return surface
+
+
+    def drawGlyphs(self, layer, text, coord, font="monospace", size=12,
+                   bold=False, italic=False, colour=(255, 255, 255),
+                   antiAliasing=False, backgroundColour=None):
+        """
+        Submits the text to the render queue on the given layer at coord
+        (top-left) as one cached surface per character, hence a string that
+        changes every frame is never rasterized again and its glyphs are
+        drawn within the layer's single 'blits' call. Kerning is ignored.
+        Returns the rect the text covers.
+        """
+
+        x, y = coord
+
+        for character in text:
+            glyph = self.render(character, font, size, bold, italic, colour,
+                                antiAliasing, backgroundColour)
+            renderQueue.submit(layer, glyph, (x, y))
+            x += glyph.get_width()
+
+        height = self.getFont(font, size, bold, italic).get_linesize()
+        return pygame.Rect(coord[0], y, x - coord[0], height)
+
+
+    def evict(self):
+        """
+        Drops the least recently used surfaces until the budget is met (the
+        most recent surface is always kept).
+        """
+
+        while self.bytesUsed > self.byteBudget and len(self.surfaceDict) > 1:
+            _, surface = self.surfaceDict.popitem(last=False)
+            self.bytesUsed -= self.getSurfaceBytes(surface)
+
+
+    def getSurfaceBytes(self, surface):
+        """
+        Returns the amount of pixel memory of the surface in bytes.
+        """
+
+        return surface.get_pitch() * surface.get_height()
+
+
+    def clear(self):
+        """
+        Empties the cache of rendered surfaces.
+        """
+
+        self.surfaceDict.clear()
+        self.bytesUsed = 0
+
+
+    def getStats(self):
+        """
+        Returns the hits, misses, amount of cached surfaces and bytes used.
+        """
+
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "surfaces": len(self.surfaceDict),
+                "bytes": self.bytesUsed}
+
+
+
+# Shared by menus and the HUD so identical text is rendered only once
+textRenderer = TextRenderer()
+
+
+
+class RenderQueue():
+    """
+    A retained-mode render list: every drawable submits what it draws during
+    a frame as (layer, surface, rect) and the queue draws everything at the
+    end of the frame, layer by layer (lowest first), with one 'blits' call per
+    layer followed by the layer's lines and other draw calls. Surfaces of the
+    same layer are drawn in the order submitted.
+    Anything submitted in world coordinates is converted to screen coordinates
+    through the camera, or culled if it is outside of the camera's view.
+    """
+
+    def __init__(self):
+        """
+        Initializes the dictionaries of layers and their queued blits and
+        draw calls, and the statistics of the last frame flushed.
+        """
+
+        self.camera = None      # set by the level manager while in a level
+
+        self.blitsDict = {}
+        self.linesDict = {}
+        self.callsDict = {}
+        self.culledAmount = 0
+
+        self.stats = {"layers": 0, "blits": 0, "blitsCalls": 0, "lines": 0,
+                      "calls": 0, "culled": 0}
+
+
+    def submit(self, layer, surface, rect, area=None):
+        """
+        Queues the surface to be drawn at rect (or a top-left coord) on the
+        given layer. 'area' optionally restricts the part of the surface drawn.
+        """
+
+        if area is None:
+            blit = (surface, rect)
+        else:
+            blit = (surface, rect, area)
+
+        self.blitsDict.setdefault(layer, []).append(blit)
+
+
+    def submitWorld(self, layer, surface, rect):
+        """
+        Queues the surface to be drawn at rect (or a top-left coord) given in
+        world coordinates, unless it is outside of the camera's view.
+        """
+
+        if self.camera is None:
+            self.submit(layer, surface, rect)
+            return
+
+        # Both rects and (x, y) coords start with the top-left coordinate
+        worldRect = surface.get_rect(topleft=(rect[0], rect[1]))
+
+        if self.camera.isVisible(worldRect):
+            self.submit(layer, surface, self.camera.toScreen(worldRect))
+        else:
+            self.culledAmount += 1
+
+
+    def submitLine(self, layer, colour, start, end, width=1):
+        """
+        Queues a straight line from start to end on the given layer. Unlike
+        the other draw calls (see 'submitCall'), the texture renderer draws
+        lines itself hence they stay within their layer there too.
+        """
+
+        self.linesDict.setdefault(layer, []).append((colour, start, end,
+                                                     width))
+
+
+    def submitWorldLine(self, layer, colour, start, end, width=1):
+        """
+        Queues a straight line from start to end given in world coordinates,
+        unless it is outside of the camera's view.
+        """
+
+        if self.camera is None:
+            self.submitLine(layer, colour, start, end, width)
+            return
+
+        lineRect = pygame.Rect(start, (0, 0)).union(pygame.Rect(end, (0, 0)))
+
+        if self.camera.isVisible(lineRect.inflate(width, width)):
+            offsetx, offsety = self.camera.getOffset()
+            self.submitLine(layer, colour,
+                            (start[0] + offsetx, start[1] + offsety),
+                            (end[0] + offsetx, end[1] + offsety), width)
+        else:
+            self.culledAmount += 1
+
+
+    def submitWorldCall(self, layer, worldRect, drawFunction):
+        """
+        Queues a draw that is not a blit (see 'submitCall') covering worldRect,
+        unless it is outside of the camera's view. 'drawFunction' is called with
+        the screen and the (x, y) offset that converts world coordinates into
+        screen coordinates.
+        """
+
+        if self.camera is None:
+            offset = (0, 0)
+        elif self.camera.isVisible(worldRect):
+            offset = self.camera.getOffset()
+        else:
+            self.culledAmount += 1
+            return
+
+        self.submitCall(layer, lambda screen: drawFunction(screen, offset))
+
+
+    def submitCall(self, layer, drawFunction):
+        """
+        Queues a draw that is neither a blit nor a line (e.g.
+        'pygame.draw.circle') on the given layer. 'drawFunction' is called
+        with the screen after the blits and lines of its layer and must return
+        the rect it drew onto.
+        """
+
+        self.callsDict.setdefault(layer, []).append(drawFunction)
+
+
+    def drain(self):
+        """
+        Empties the queue and returns what was queued as a list of
+        (layer, blitsList, linesList, callsList) ordered from the lowest
+        layer. Also updates the statistics (except the amount of 'blits'
+        calls).
+        """
+
+        layersList = [(layer, self.blitsDict.get(layer, []),
+                       self.linesDict.get(layer, []),
+                       self.callsDict.get(layer, [])) for layer in
+                      sorted(self.blitsDict.keys() | self.linesDict.keys() |
+                             self.callsDict.keys())]
+
+        self.stats = {"layers": len(layersList),
+                      "blits": sum(len(blitsList) for _, blitsList, _, _ in
+                                   layersList),
+                      "blitsCalls": 0,
+                      "lines": sum(len(linesList) for _, _, linesList, _ in
+                                   layersList),
+                      "calls": sum(len(callsList) for _, _, _, callsList in
+                                   layersList),
+                      "culled": self.culledAmount}
+
+        self.blitsDict = {}
+        self.linesDict = {}
+        self.callsDict = {}
+        self.culledAmount = 0
+
+        return layersList
+
+
+    def flush(self, screen):
+        """
+        Draws everything queued onto the screen, registers the rects drawn
+        with the dirty rectangle renderer (if used) and empties the queue.
+        """
+
+        for _, blitsList, linesList, callsList in self.drain():
+            if blitsList:
+                for rect in screen.blits(blitsList):
+                    markDirty(rect)
+
+                self.stats["blitsCalls"] += 1
+
+            for colour, start, end, width in linesList:
+                markDirty(pygame.draw.line(screen, colour, start, end, width))
+
+            for drawFunction in callsList:
+                markDirty(drawFunction(screen))
+
+
+    def getStats(self):
+        """
+        Returns the statistics of the last frame flushed: the amount of layers,
+        blits, 'blits' calls, lines, other draw calls and surfaces culled.
+        """
+
+        return dict(self.stats)
+
+
+
+class Camera():
+    """
+    The view of the screen onto the world. Sprites and levels live in world
+    coordinates and are only converted to screen coordinates when drawn. The
+    camera follows a target (e.g. the player) while staying within the world.
+    """
+
+    def __init__(self, viewSize, worldRect=None):
+        """
+        'viewSize' is the size of the screen. 'worldRect' bounds the view; a
+        world smaller than the view keeps the view centred on it.
+        """
+
+        self.viewRect = pygame.Rect((0, 0), viewSize)
+        self.worldRect = worldRect
+
+
+    def follow(self, targetRect):
+        """
+        Centres the view on the target rect (within the world bounds). As the
+        whole screen changes when the view scrolls, a full redraw is requested
+        (see 'requestFullRedraw').
+        """
+
+        viewRect = self.viewRect.copy()
+        viewRect.center = targetRect.center
+
+        if self.worldRect is not None:
+            viewRect.clamp_ip(self.worldRect)
+
+        if viewRect.topleft != self.viewRect.topleft:
+            self.viewRect = viewRect
+            requestFullRedraw()
+
+
+    def getOffset(self):
+        """
+        Returns the (x, y) offset that converts world coordinates into screen
+        coordinates.
+        """
+
+        return (-self.viewRect.x, -self.viewRect.y)
+
+
+    def isVisible(self, worldRect):
+        """
+        Checks whether any part of the world rect is within the view.
+        """
+
+        return self.viewRect.colliderect(worldRect)
+
+
+    def toScreen(self, worldRect):
+        """
+        Returns the world rect converted into screen coordinates.
+        """
+
+        return pygame.Rect(worldRect).move(-self.viewRect.x, -self.viewRect.y)
+
+
+    def toWorld(self, screenPoint):
+        """
+        Returns the screen point (e.g. a mouse click) converted into world
+        coordinates.
+        """
+
+        return (screenPoint[0] + self.viewRect.x,
+                screenPoint[1] + self.viewRect.y)
+
+
+
+class DirtyRectRenderer():
+    """
+    Presents only the regions of the screen that changed during a frame
+    (through 'pygame.display.update(rects)') rather than flipping the whole
+    screen. Everything drawn registers its rect via 'markDirty' and, on the
+    next frame, those rects are restored from the cached background via
+    'restore' instead of redrawing the full background.
+    """
+
+    def __init__(self, screen):
+        """
+        Initializes the lists of rects and the counter of pixels pushed to the
+        display every frame.
+        """
+
+        self.screen = screen
+        self.screenRect = screen.get_rect()
+
+        self.dirtyList = []     # rects to present this frame
+        self.drawnList = []     # rects drawn this frame (restored next frame)
+        self.restoreList = []   # rects to restore at the next clear
+
+        self.isFullRedraw = True
+        self.isRestored = False
+        self.pixelsPushed = 0
+
+
+    def markDirty(self, rect):
+        """
+        Registers a rect that has been drawn onto during this frame.
+        """
+
+        rect = self.screenRect.clip(rect)
+
+        if rect.width and rect.height:
+            self.dirtyList.append(rect)
+            self.drawnList.append(rect)
+
+
+    def invalidate(self, rect):
+        """
+        Registers a rect of the background that changed (e.g. a background
+        tile was replaced) hence must be restored at the next clear.
+        """
+
+        rect = self.screenRect.clip(rect)
+
+        if rect.width and rect.height:
+            self.restoreList.append(rect)
+
+
+    def requestFullRedraw(self):
+        """
+        Causes the next frame to be drawn and presented in full (e.g. after a
+        menu or level change).
+        """
+
+        self.isFullRedraw = True
+
+
+    def restore(self, background, coord=(0, 0)):
+        """
+        Redraws the background (its top-left drawn at coord) only over the
+        rects drawn during the previous frame or invalidated since. Anything
+        outside of the background is filled black.
+        """
+
+        backgroundRect = background.get_rect(topleft=(coord[0], coord[1]))
+
+        for rect in self.restoreList:
+            if not backgroundRect.contains(rect):
+                self.screen.fill((0, 0, 0), rect)
+
+            area = rect.clip(backgroundRect)
+            self.screen.blit(background, area.topleft,
+                             area.move(-backgroundRect.x, -backgroundRect.y))
+            self.dirtyList.append(rect)
+
+        self.restoreList = []
+        self.isRestored = True
+
+
+    def present(self):
+        """
+        Pushes the dirty rects (or the whole screen when a full redraw was
+        requested) to the display and counts the pixels pushed. If 'restore'
+        was not called this frame (the caller redrew its background itself),
+        the rects awaiting a restore are presented now rather than kept.
+        """
+
+        if self.isFullRedraw:
+            updateDisplay()
+            self.pixelsPushed = self.screenRect.width * self.screenRect.height
+            self.isFullRedraw = False
+
+            # The full redraw already restored every older rect
+            self.restoreList = []
+        else:
+            if not self.isRestored:
+                self.dirtyList.extend(self.restoreList)
+                self.restoreList = []
+
+            updateDisplay(self.dirtyList)
+            self.pixelsPushed = sum(rect.width * rect.height for rect in
+                                    self.dirtyList)
+
+        self.restoreList.extend(self.drawnList)
+        self.dirtyList = []
+        self.drawnList = []
+        self.isRestored = False
+
+
+    def getStats(self):
+        """
+        Returns the pixels pushed during the last frame and the fraction of
+        the screen they represent.
+        """
+
+        screenPixels = self.screenRect.width * self.screenRect.height
+
+        return {"pixelsPushed": self.pixelsPushed,
+                "screenFraction": self.pixelsPushed / screenPixels}
+
+
+
+renderQueue = RenderQueue()
+
+class Upscaler():
+    """
+    Presents a fixed (logical) resolution screen on a window of any size by
+    scaling it up by the largest whole number that fits the window with
+    nearest neighbour scaling, hence pixel art stays sharp. The scaled screen
+    is centred and the rest of the window is black. Everything the game draws
+    goes onto the logical screen so the cost of a frame does not depend on the
+    window's size.
+
+    The logical screen is never the window itself, even when both have the
+    same size: every menu, level and renderer keeps drawing onto the same
+    logical screen whatever the window is resized to (the scale is computed
+    again on every resize, see 'setWindow').
+    """
+
+    def __init__(self, window, logicalSize, tileSize=32):
+        """
+        Creates the logical screen of size 'logicalSize' for the window (the
+        display surface). Dirty rects are scaled in tiles of 'tileSize'
+        logical pixels (see 'getTile').
+        """
+
+        self.screen = pygame.Surface(logicalSize).convert()
+        self.screenRect = pygame.Rect((0, 0), logicalSize)
+        self.tileSize = tileSize
+
+        self.setWindow(window)
+
+
+    def setWindow(self, window):
+        """
+        Computes the scale and the area of the window the logical screen is
+        scaled onto. The area (a subsurface of the window) is kept while the
+        window's size is unchanged so presenting never allocates a surface.
+        Must be called again whenever the window is resized (or switched to
+        fullscreen).
+        """
+
+        self.window = window
+        self.tileDict = {}
+        windowWidth, windowHeight = window.get_size()
+
+        self.scale = max(1, min(windowWidth // self.screenRect.width,
+                                windowHeight // self.screenRect.height))
+
+        scaledRect = pygame.Rect(0, 0, self.screenRect.width * self.scale,
+                                 self.screenRect.height * self.scale)
+        scaledRect.center = window.get_rect().center
+
+        # A window smaller than the logical screen shows its top-left part
+        scaledRect.topleft = (max(scaledRect.x, 0), max(scaledRect.y, 0))
+        self.scaledRect = scaledRect.clip(window.get_rect())
+        self.scaledArea = window.subsurface(self.scaledRect)
+
+        window.fill((0, 0, 0))
+
+
+    def toLogical(self, windowPoint):
+        """
+        Converts a window point (e.g. the mouse's position) into a logical
+        screen point.
+        """
+
+        return ((windowPoint[0] - self.scaledRect.x) // self.scale,
+                (windowPoint[1] - self.scaledRect.y) // self.scale)
+
+
+    def toLogicalMotion(self, windowMotion):
+        """
+        Converts a window distance (e.g. the mouse's relative motion) into a
+        logical screen distance.
+        """
+
+        return (int(windowMotion[0] / self.scale),
+                int(windowMotion[1] / self.scale))
+
+
+    def present(self, rectsList=None):
+        """
+        Scales the whole logical screen (or only the rects given, in logical
+        coordinates) onto the window and pushes it to the display.
+        """
+
+        if rectsList is None:
+            # The window can only be smaller than the scaled screen at scale 1
+            # and blitting clips by itself
+            if self.scale == 1:
+                self.scaledArea.blit(self.screen, (0, 0))
+            else:
+                pygame.transform.scale(self.screen, self.scaledArea.get_size(),
+                                       self.scaledArea)
+
+            pygame.display.flip()
+            return
+
+        windowRectsList = []
+
+        if self.scale == 1:
+            for rect in rectsList:
+                rect = self.screenRect.clip(rect)
+
+                if rect.width and rect.height:
+                    windowRectsList.append(self.scaledArea.blit(
+                        self.screen, rect, rect).move(self.scaledRect.topleft))
+        else:
+            tilesSet = set()
+            for rect in rectsList:
+                tilesSet.update(self.getTiles(self.screenRect.clip(rect)))
+
+            for tile in tilesSet:
+                tileSurface, scaledSurface, windowRect = self.getTile(*tile)
+
+                pygame.transform.scale(tileSurface, windowRect.size,
+                                       scaledSurface)
+                windowRectsList.append(windowRect)
+
+        pygame.display.update(windowRectsList)
+
+
+    def getTiles(self, rect):
+        """
+        Returns the (column, row) of every tile the logical rect overlaps.
+        """
+
+        if not (rect.width and rect.height):
+            return []
+
+        return [(column, row)
+                for column in range(rect.left // self.tileSize,
+                                    (rect.right - 1) // self.tileSize + 1)
+                for row in range(rect.top // self.tileSize,
+                                 (rect.bottom - 1) // self.tileSize + 1)]
+
+
+    def getTile(self, column, row):
+        """
+        Returns the subsurface of the logical screen covered by the tile, the
+        subsurface of the window it is scaled onto and the window rect of the
+        latter. They are built on the tile's first use and kept while the
+        window's size is unchanged, hence presenting dirty rects allocates
+        nothing.
+        """
+
+        if (column, row) not in self.tileDict:
+            tileRect = pygame.Rect(column * self.tileSize, row * self.tileSize,
+                                   self.tileSize, self.tileSize)
+            tileRect = tileRect.clip(self.screenRect)
+
+            scaledRect = pygame.Rect(tileRect.x * self.scale,
+                                     tileRect.y * self.scale,
+                                     tileRect.width * self.scale,
+                                     tileRect.height * self.scale)
+
+            self.tileDict[(column, row)] = (
+                self.screen.subsurface(tileRect),
+                self.scaledArea.subsurface(scaledRect),
+                scaledRect.move(self.scaledRect.topleft))
+
+        return self.tileDict[(column, row)]
+
+
+
+class TextureRenderer():
+    """
+    Presents frames through an SDL2 renderer (textures composited by the
+    renderer, on the GPU if available) instead of compositing everything
+    into a software display surface. Whatever is drawn directly onto the
+    screen surface (level and menu backgrounds) is uploaded as a streaming
+    texture only when it is redrawn (see 'requestFullRedraw'). So is the
+    background layer of the render queue, which stays drawn across frames
+    (e.g. the splash's background built up tile by tile). The other surfaces
+    submitted to the render queue (sprite frames, doors, rotated hooks,
+    buttons) are static hence uploaded once as textures, then drawn as texture
+    copies every frame. Lines are drawn by the renderer itself.
+    """
+
+    def __init__(self, windowSize, logicalSize, title="", isAccelerated=None):
+        """
+        Opens a window of size 'windowSize' showing a screen of size
+        'logicalSize' (scaled by the renderer, once per frame: the frame is
+        composited at the logical size into a target texture which is then
+        copied onto the window). 'isAccelerated' forces a GPU
+        (True) or the software renderer (False); by default the GPU is used if
+        there is one, otherwise the software renderer.
+        """
+
+        if video is None:
+            raise RuntimeError("The texture renderer requires pygame 2.")
+
+        # Surfaces can only be converted to a display's pixel format, hence a
+        # hidden display is kept alongside the renderer's window
+        pygame.display.set_mode((1, 1), pygame.HIDDEN)
+
+        accelerated = {None: -1, False: 0, True: 1}[isAccelerated]
+
+        self.window = video.Window(title, windowSize, resizable=True)
+        self.renderer = video.Renderer(self.window, accelerated=accelerated)
+        self.renderer.logical_size = logicalSize
+
+        self.screen = pygame.Surface(logicalSize).convert()
+        self.screenTexture = video.Texture(self.renderer, logicalSize,
+                                           streaming=True)
+        self.frameTexture = video.Texture(self.renderer, logicalSize,
+                                          target=True)
+        self.isFullRedraw = True
+
+        # Other draw calls are drawn onto a transparent overlay which is
+        # uploaded and drawn within their layer (created on first use)
+        self.overlay = None
+        self.overlayTexture = None
+
+        # Textures are dropped along with the surfaces they were uploaded from
+        self.textureDict = weakref.WeakKeyDictionary()
+        self.uploads = 0
+        self.screenUploads = 0
+        self.copies = 0
+
+
+    def requestFullRedraw(self):
+        """
+        Causes the next frame to redraw the screen surface (e.g. after the
+        camera scrolled or a background tile changed) and upload it again.
+        """
+
+        self.isFullRedraw = True
+
+
+    def getTexture(self, surface):
+        """
+        Returns the texture of the surface, uploading it on first use.
+        """
+
+        texture = self.textureDict.get(surface)
+
+        if texture is None:
+            texture = video.Texture.from_surface(self.renderer, surface)
+            self.textureDict[surface] = texture
+            self.uploads += 1
+
+        return texture
+
+
+    def present(self, queue):
+        """
+        Draws the screen surface (uploaded again only if it was redrawn) and
+        then everything in the render queue layer by layer: the blits as
+        texture copies, the lines with the renderer and the other draw calls
+        through the overlay. Presents the frame.
+        """
+
+        layersList = queue.drain()
+
+        # The background layer is drawn onto the screen surface, just like on
+        # the software backends, as the renderer is cleared every frame
+        if layersList and layersList[0][0] == BACKGROUNDLAYER:
+            _, blitsList, linesList, callsList = layersList.pop(0)
+
+            if blitsList:
+                self.screen.blits(blitsList, doreturn=False)
+                queue.stats["blitsCalls"] += 1
+            for colour, start, end, width in linesList:
+                pygame.draw.line(self.screen, colour, start, end, width)
+            for drawFunction in callsList:
+                drawFunction(self.screen)
+
+            self.isFullRedraw = True
+
+        if self.isFullRedraw:
+            self.screenTexture.update(self.screen)
+            self.screenUploads += 1
+            self.isFullRedraw = False
+
+        self.renderer.target = self.frameTexture
+        self.screenTexture.draw()
+
+        self.copies = 0
+        for _, blitsList, linesList, callsList in layersList:
+            for surface, rect, *area in blitsList:
+                if area:
+                    sourceRect = pygame.Rect(area[0])
+                else:
+                    sourceRect = surface.get_rect()
+
+                # Both rects and (x, y) coords start with the top-left
+                destinationRect = sourceRect.move(-sourceRect.x + rect[0],
+                                                  -sourceRect.y + rect[1])
+
+                self.getTexture(surface).draw(sourceRect, destinationRect)
+                self.copies += 1
+
+            for colour, start, end, width in linesList:
+                self.drawLine(colour, start, end, width)
+
+            if callsList:
+                self.drawCalls(callsList)
+
+        # Only the composited frame is scaled onto the window
+        self.renderer.target = None
+        self.renderer.draw_color = (0, 0, 0, 255)
+        self.renderer.clear()
+        self.frameTexture.draw()
+
+        self.renderer.present()
+
+
+    def drawLine(self, colour, start, end, width=1):
+        """
+        Draws a line with the renderer. A thick line is drawn as 'width'
+        parallel lines, shifted along the axis 'pygame.draw.line' shifts them
+        along, hence it looks the same on both backends.
+        """
+
+        self.renderer.draw_color = pygame.Color(colour)
+
+        isSteep = abs(end[1] - start[1]) > abs(end[0] - start[0])
+
+        for shift in range(-((width - 1) // 2), width // 2 + 1):
+            shiftx, shifty = (shift, 0) if isSteep else (0, shift)
+
+            self.renderer.draw_line((start[0] + shiftx, start[1] + shifty),
+                                    (end[0] + shiftx, end[1] + shifty))
+
+
+    def drawCalls(self, callsList):
+        """
+        Draws the draw calls of a layer onto the cleared overlay, uploads the
+        area they drew onto and draws it on top of the layer.
+        """
+
+        if self.overlay is None:
+            self.overlay = pygame.Surface(self.screen.get_size(),
+                                          pygame.SRCALPHA)
+            self.overlayTexture = video.Texture(self.renderer,
+                                                self.screen.get_size(),
+                                                streaming=True)
+            self.overlayTexture.blend_mode = pygame.BLENDMODE_BLEND
+
+        self.overlay.fill((0, 0, 0, 0))
+
+        drawnRect = pygame.Rect(callsList[0](self.overlay))
+        for drawFunction in callsList[1:]:
+            drawnRect.union_ip(drawFunction(self.overlay))
+
+        drawnRect = drawnRect.clip(self.overlay.get_rect())
+
+        if drawnRect.width and drawnRect.height:
+            self.overlayTexture.update(self.overlay.subsurface(drawnRect),
+                                       drawnRect)
+            self.overlayTexture.draw(drawnRect, drawnRect)
+
+
+    def getStats(self):
+        """
+        Returns the amount of textures uploaded (in total), of uploads of the
+        screen surface (in total) and of textures copied during the last frame.
+        """
+
+        return {"uploads": self.uploads, "screenUploads": self.screenUploads,
+                "copies": self.copies}
+
+
+
+# Set by the game when the dirty rectangle mode is used (otherwise None)
+dirtyRenderer = None
+
+# Set by the game to present the logical screen on the window (or None)
+upscaler = None
+
+# Set by the game when the texture backend is used (otherwise None)
+textureRenderer = None
+
+
+def markDirty(rect):
+    """
+    Registers a drawn rect with the dirty rectangle renderer, if used.
+    Returns the rect so it can wrap a blit call.
+    """
+
+    if dirtyRenderer is not None:
+        dirtyRenderer.markDirty(rect)
+
+    return rect
+
+
+def updateDisplay(rectsList=None):
+    """
+    Pushes the whole screen (or only the rects given) to the display, through
+    the upscaler if used.
+    """
+
+    if upscaler is not None:
+        upscaler.present(rectsList)
+    elif rectsList is None:
+        pygame.display.flip()
+    else:
+        pygame.display.update(rectsList)
+
+
+def toScreen(worldRect):
+    """
+    Converts a world rect into screen coordinates through the render queue's
+    camera, if any.
+    """
+
+    if renderQueue.camera is None:
+        return pygame.Rect(worldRect)
+
+    return renderQueue.camera.toScreen(worldRect)
+
+
+def toWorld(screenPoint):
+    """
+    Converts a screen point into world coordinates through the render queue's
+    camera, if any.
+    """
+
+    if renderQueue.camera is None:
+        return tuple(screenPoint)
+
+    return renderQueue.camera.toWorld(screenPoint)
+
+
+def invalidate(rect):
+    """
+    Registers a changed background rect with the dirty rectangle renderer,
+    if used.
+    """
+
+    if dirtyRenderer is not None:
+        dirtyRenderer.invalidate(rect)
+
+    # The texture renderer uploads the screen surface as a whole
+    if textureRenderer is not None:
+        textureRenderer.requestFullRedraw()
+
+
+def requestFullRedraw():
+    """
+    Causes the next frame to be drawn in full by the dirty rectangle renderer
+    or the texture renderer, if used (e.g. after a menu or level change).
+    """
+
+    if dirtyRenderer is not None:
+        dirtyRenderer.requestFullRedraw()
+
+    if textureRenderer is not None:
+        textureRenderer.requestFullRedraw()
+
+
+def isFullRedraw():
+    """
+    Checks whether the whole screen should be drawn this frame: always the
+    case unless the dirty rectangle renderer or the texture renderer is used.
+    """
+
+    if textureRenderer is not None:
+        return textureRenderer.isFullRedraw
+
+    return dirtyRenderer is None or dirtyRenderer.isFullRedraw
+
+
+def restoreBackground(screen, background, coord=(0, 0)):
+    """
+    Clears the screen by drawing the background (its top-left at coord): in
+    full, or only over the dirty rects if the dirty rectangle renderer is
+    used.
+    """
+
+    if isFullRedraw():
+        screen.blit(background, coord)
+    elif dirtyRenderer is not None:
+        dirtyRenderer.restore(background, coord)
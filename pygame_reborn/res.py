@@ -4,6 +4,13 @@
 import pygame
 import warnings
 import os
+import json
+import mmap
+import struct
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 
 ################################ SETTINGS ######################################
@@ -13,12 +20,16 @@ import os
 DEFAULTSCREENSIZE = (1024, 768)
 SCREENSIZE = DEFAULTSCREENSIZE
 
-# TODO: scaling screen resolution
-# SCREENXSCALE = 1
-# SCREENYSCALE = 1
+# The game is drawn at this fixed (logical) resolution whatever the window
+# size, then upscaled by the largest whole number that fits the window (twice
+# on the default window)
+LOGICALSCREENSIZE = (512, 384)
 
 SOUNDLEVEL = 10
 GAMEFPS = 30
+
+# Threads used to decode artwork (pygame releases the GIL while decoding)
+LOADERWORKERS = os.cpu_count() or 1
 DO = False  # special button ;)
 
 ################################## EVENTS ######################################
@@ -36,7 +47,7 @@ MOVED = pygame.USEREVENT + 5
 
 # Title text
 TITLEFONT = "arial"
-TITLEFONTSIZE = 150
+TITLEFONTSIZE = 75
 
 
 TTLTXT = "EXILED"
@@ -44,7 +55,11 @@ TTLTXT = "EXILED"
 
 # Main Screen txt
 MENUFONT = "georgia"
-MENUFONTSIZE = 30
+MENUFONTSIZE = 15
+
+# The menu's highlight arrow is drawn for text of this size (scaled to fit
+# the others)
+ARROWFONTSIZE = 30
 
 
 MSTXT1 = "New Game"
@@ -52,6 +67,9 @@ MSTXT2 = "Load"
 MSTXT3 = "Options"
 MSTXT4 = "Exit"
 
+# Resolved font paths persisted across runs (see FontResolver)
+FONTCACHE = "fonts.cache"
+
 ################################## ARTWORK #####################################
 
 ART_MENU = "artwork/menu"
@@ -61,6 +79,21 @@ ART_MISC = "artwork/misc"
 ART_SPRITE_NAMELESS = "artwork/sprite/nameless"
 ART_EVILDOER = "artwork/sprite/evildoer"
 
+# Directories packed into a single texture atlas once first requested. The
+# sprite directories are left out: an atlas decodes its whole directory while
+# a sprite's clips are loaded one action state at a time (see LazyArtwork)
+ART_ATLASES = (ART_MISC,)
+
+# Prebuilt raw pixel bundle of the artwork directory (see bundle.py)
+ART_BUNDLE = "artwork.bundle"
+BUNDLEMAGIC = b"EXILEDB1"
+BUNDLEHEADER = "<8sI"   # magic, length of the JSON index in bytes
+BUNDLEPIXELFORMAT = "RGBA"
+
+# Token index of the artwork directory (see ArtworkManifest)
+ART_ROOT = "artwork"
+ART_MANIFEST = "artwork.manifest"
+
 ###############################################################################
 
 # Main purpose is to omit the declaration of an event in other modules before
@@ -104,79 +137,1213 @@ def isFontFound(font):
     boolean.
     """
 
-    sysFontsList = pygame.font.get_fonts()
-
-    if font in sysFontsList:
+    if _fontResolver.resolve(font)["path"]:
         return True
     else:
         return False
 
 
-# TODO: os.sep
-def loadArtworkFrom(dirPath, *searchQuery):
+def loadFont(font, size, bold=False, italic=False):
     """
-    The path from the current working directory to the target directory
-    needs to be passed as the argument and the artworks first name before the
-    "_". Then the function proceeds to store those images into a dictionary.
-    For instance to obtain all tile images, the dirPath must be provided and
-    artworkName="tile":
+    The equivalent of 'pygame.font.SysFont' except the font file is found
+    through the persisted font cache rather than by scanning the system font
+    directories.
+    """
+
+    return _fontResolver.loadFont(font, size, bold, italic)
+
+
+def saveFontCache():
+    """
+    Persists the fonts resolved so far (see 'FontResolver.save'). Meant to be
+    called once the fonts of the menus have been loaded rather than on every
+    lookup.
+    """
+
+    _fontResolver.save()
+
+
+def getFontReport():
+    """
+    Returns the time spent looking up fonts along with the cache hits and
+    misses.
+    """
+
+    return _fontResolver.getReport()
+
+
+
+class FontResolver():
+    """
+    Maps (font, bold, italic) to a font file path. The mapping is kept in a
+    small JSON file that is only trusted while the modification times of the
+    system font directories are unchanged, hence most starts open fonts by
+    path without pygame scanning (and fontconfig listing) every system font.
     """
 
-    imageDict = {}
-    if os.path.exists(dirPath):
-        imagesList = os.listdir(dirPath)
+    def __init__(self, cachePath=FONTCACHE):
+        """
+        Reads the font cache if it exists and is still valid.
+        """
+
+        self.cachePath = cachePath
+        self.fontDict = {}
+        self.dirMtimeDict = {}
+        self.isValidated = False
+        self.isChanged = False
+
+        self.lookupTime = 0
+        self.hits = 0
+        self.misses = 0
+
 
-        if imagesList:  # Checks if images exist otherwise raises an error
-            imageDict = _storeImages(dirPath, imagesList, *searchQuery)
+    def findFontDirectories(self):
+        """
+        Returns a dictionary of the system font directories (including their
+        sub-directories) and their modification times.
+        """
+
+        if sys.platform == "win32":
+            rootsList = [os.path.join(os.environ.get("WINDIR", "C:\\Windows"),
+                                      "Fonts")]
+        elif sys.platform == "darwin":
+            rootsList = ["/Library/Fonts", "/System/Library/Fonts",
+                         os.path.expanduser("~/Library/Fonts")]
         else:
-            raise OSError("No images found in the specified directory.")
-    else:
-        raise OSError("Specified directory does not exist.")
+            rootsList = ["/usr/share/fonts", "/usr/local/share/fonts",
+                         os.path.expanduser("~/.fonts"),
+                         os.path.expanduser("~/.local/share/fonts")]
+
+        dirMtimeDict = {}
+        for rootPath in rootsList:
+            for dirPath, _, _ in os.walk(rootPath):
+                dirMtimeDict[dirPath] = os.stat(dirPath).st_mtime_ns
+
+        return dirMtimeDict
+
+
+    def validate(self):
+        """
+        Loads the cached fonts on the first lookup, discarding them if any
+        font directory was added, removed or modified since they were saved.
+        """
+
+        self.isValidated = True
+        self.dirMtimeDict = self.findFontDirectories()
+
+        try:
+            with open(self.cachePath) as cacheFile:
+                cache = json.load(cacheFile)
+        except (OSError, ValueError):
+            return
+
+        if cache.get("dirs") == self.dirMtimeDict:
+            self.fontDict = cache.get("fonts", {})
+
+
+    def save(self):
+        """
+        Writes the resolved fonts along with the font directories' mtimes,
+        only if a font has been resolved since the last save.
+        """
+
+        if not self.isChanged:
+            return
+
+        try:
+            with open(self.cachePath, "w") as cacheFile:
+                json.dump({"dirs": self.dirMtimeDict,
+                           "fonts": self.fontDict}, cacheFile)
+        except OSError:
+            warnings.warn("Could not write the font cache.")
+
+        self.isChanged = False
+
+
+    def resolve(self, font, bold=False, italic=False):
+        """
+        Returns a dictionary holding the font file "path" (None if the font
+        is not installed) and whether bold and italic must be emulated
+        ("fakeBold", "fakeItalic") since no styled file exists.
+        """
+
+        startTime = time.perf_counter()
 
-    return imageDict
+        if not self.isValidated:
+            self.validate()
 
+        key = "{}|{}|{}".format(font, int(bold), int(italic))
 
-def _storeImages(dirPath, imagesList, *searchQuery):
+        if key in self.fontDict:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+            path = pygame.font.match_font(font, bold, italic)
+            regularPath = pygame.font.match_font(font)
+            isStyledFileMissing = path is None or path == regularPath
+
+            self.fontDict[key] = {"path": path,
+                                  "fakeBold": bold and isStyledFileMissing,
+                                  "fakeItalic": italic and isStyledFileMissing}
+            self.isChanged = True
+
+        self.lookupTime += time.perf_counter() - startTime
+
+        return self.fontDict[key]
+
+
+    def loadFont(self, font, size, bold=False, italic=False):
+        """
+        Opens the font by its path (pygame's default font if not installed)
+        and emulates the style that has no file of its own.
+        """
+
+        resolved = self.resolve(font, bold, italic)
+
+        if resolved["path"]:
+            fontObject = pygame.font.Font(resolved["path"], size)
+        else:
+            fontObject = pygame.font.Font(None, size)
+            resolved = {"fakeBold": bold, "fakeItalic": italic}
+
+        if resolved["fakeBold"]:
+            fontObject.set_bold(True)
+        if resolved["fakeItalic"]:
+            fontObject.set_italic(True)
+
+        return fontObject
+
+
+    def getReport(self):
+        """
+        Returns the time spent looking up fonts (in seconds) along with the
+        cache hits and misses.
+        """
+
+        return {"lookupTime": self.lookupTime,
+                "hits": self.hits,
+                "misses": self.misses}
+
+
+
+_fontResolver = FontResolver()
+
+
+class ArtworkCache():
+    """
+    A process-wide store of decoded surfaces so that an image file is read and
+    decoded only once no matter how many sprites, tiles or menus request it.
+    Single images are keyed by their path and the dictionaries built by
+    'loadArtworkFrom' are keyed by (dirPath, searchQuery).
+
+    The cache may be filled from a worker thread (e.g. level prefetching)
+    hence the stores and counters are only touched while holding the lock.
+    Decoding itself happens outside of it. Surfaces are only converted on the
+    main thread (the one owning the display); those stored from any other
+    thread are converted by 'convertPending'.
     """
-    As specified by the searchQuery, the matched image files are stored
-    into a dictionary. The dictionary key is based on the image file's name
-    minus the searchQuery.
 
-    For instance, searching for "tile", "blue" in a folder that contains the
-    image "tile_blue_03.png" will yield:
+    def __init__(self):
+        """
+        Creates the empty image and artwork stores along with the hit and miss
+        counters.
+        """
+
+        self.lock = threading.RLock()
+
+        self.imageDict = {}
+        self.artworkDict = {}
+        self.atlasDict = {}
+        self.atlasDirSet = set()
+        self.bundle = None
+
+        # Stored unconverted by a worker thread, and preloaded but not yet
+        # requested (their miss is counted already)
+        self.pendingSet = set()
+        self.preloadedSet = set()
+
+        self.hits = 0
+        self.misses = 0
+
+
+    def getImage(self, imagePath):
+        """
+        Returns the surface of the given image file, decoding (and converting
+        if a display exists) it only on the first request. If the image's
+        directory has been packed into an atlas, a subsurface of that atlas is
+        returned instead.
+        """
+
+        key = os.path.normpath(imagePath)
+
+        with self.lock:
+            if key in self.imageDict:
+                if key in self.preloadedSet:
+                    self.preloadedSet.discard(key)
+                else:
+                    self.hits += 1
+                return self.imageDict[key]
+
+            self.misses += 1
+            self.preloadedSet.discard(key)
+            dirPath, imageName = os.path.split(key)
+
+        atlas = self.getAtlas(dirPath)
+
+        if atlas and atlas.hasImage(imageName):
+            image = atlas.getImage(imageName)
+        else:
+            image = self.decodeForCache(key)
+
+        with self.lock:
+            # Another thread may have stored it meanwhile; keep the first one
+            return self.imageDict.setdefault(key, image)
+
+
+    def preloadImages(self, imagePathsList, workers=1):
+        """
+        Decodes the given images that are not stored yet across a pool of
+        'workers' threads and then stores them. Images of directories packed
+        into an atlas are skipped as they are decoded already.
+        """
+
+        # The atlases of registered directories are packed before deciding
+        # which images still need decoding
+        for dirPath in {os.path.dirname(os.path.normpath(imagePath))
+                        for imagePath in imagePathsList}:
+            self.getAtlas(dirPath)
+
+        keysList = []
+        with self.lock:
+            for imagePath in imagePathsList:
+                key = os.path.normpath(imagePath)
+
+                if (key not in self.imageDict and key not in keysList and
+                        os.path.dirname(key) not in self.atlasDict):
+                    keysList.append(key)
+
+        if workers > 1 and len(keysList) > 1:
+            with ThreadPoolExecutor(min(workers, len(keysList))) as executor:
+                surfacesList = list(executor.map(self.decodeImage, keysList))
+        else:
+            surfacesList = [self.decodeImage(key) for key in keysList]
+
+        # Converted and stored once the pool has joined, the miss is counted
+        # here and the first request of each image is not counted as a hit
+        surfacesList = [self.prepareForCache(key, surface) for key, surface in
+                        zip(keysList, surfacesList)]
+
+        with self.lock:
+            for key, surface in zip(keysList, surfacesList):
+                self.misses += 1
+                self.preloadedSet.add(key)
+                self.imageDict.setdefault(key, surface)
+
+
+    def decodeForCache(self, key):
+        """
+        Decodes an image to be stored in the cache, taken from the bundle if
+        it holds an up to date copy and otherwise from the PNG. Either way it
+        is converted once (a bundled surface would otherwise be blitted from
+        the bundle's raw RGBA memory every frame).
+        """
+
+        return self.prepareForCache(key, self.decodeImage(key))
+
+
+    def prepareForCache(self, key, surface):
+        """
+        Returns the decoded surface converted if called from the main thread,
+        otherwise returns it as is and marks it to be converted later by
+        'convertPending'.
+        """
 
-    "tile_blue_03.png" -- stored --> imageDict{("03")} = image file
+        if threading.current_thread() is threading.main_thread():
+            return convertImage(surface)
+
+        with self.lock:
+            self.pendingSet.add(key)
+
+        return surface
+
+
+    def convertPending(self):
+        """
+        Converts the images stored by worker threads (must be called from the
+        main thread), replacing them in the stored artwork dictionaries too.
+        """
+
+        if pygame.display.get_surface() is None:
+            return
+
+        with self.lock:
+            pendingList = [key for key in self.pendingSet
+                           if key in self.imageDict]
+            self.pendingSet.clear()
+
+            convertedDict = {}
+            for key in pendingList:
+                surface = self.imageDict[key]
+                self.imageDict[key] = convertImage(surface)
+                convertedDict[id(surface)] = self.imageDict[key]
+
+            for artworkDict in self.artworkDict.values():
+                for name, surface in artworkDict.items():
+                    if id(surface) in convertedDict:
+                        artworkDict[name] = convertedDict[id(surface)]
+
+
+    def getArtwork(self, dirPath, searchQuery, loadFunction):
+        """
+        Returns the artwork dictionary of the given directory and search query.
+        On a miss, 'loadFunction' is called to build it. A shallow copy is
+        returned so callers may modify the dictionary itself (but not the
+        surfaces, which are shared).
+        """
+
+        key = (os.path.normpath(dirPath), tuple(searchQuery))
+
+        with self.lock:
+            if key in self.artworkDict:
+                self.hits += 1
+                return dict(self.artworkDict[key])
+
+            self.misses += 1
+
+        artworkDict = loadFunction()
+
+        with self.lock:
+            return dict(self.artworkDict.setdefault(key, artworkDict))
+
+
+    def hasArtwork(self, dirPath, searchQuery):
+        """
+        Checks whether the artwork dictionary of the given directory and
+        search query is stored.
+        """
+
+        with self.lock:
+            return (os.path.normpath(dirPath), tuple(searchQuery)) in \
+                self.artworkDict
+
+
+    def registerAtlas(self, dirPath):
+        """
+        Marks the given directory to be packed into a texture atlas the first
+        time one of its images is requested (see 'getAtlas').
+        """
+
+        with self.lock:
+            self.atlasDirSet.add(os.path.normpath(dirPath))
+
+
+    def getAtlas(self, dirPath):
+        """
+        Returns the atlas of the given directory or None. A registered
+        directory is packed on its first request from the main thread (the
+        atlas is converted hence needs the display); worker threads decode
+        its images one by one meanwhile.
+        """
+
+        dirPath = os.path.normpath(dirPath)
+
+        with self.lock:
+            if dirPath in self.atlasDict or dirPath not in self.atlasDirSet:
+                return self.atlasDict.get(dirPath)
+
+        if threading.current_thread() is not threading.main_thread():
+            return None
+
+        return self.addAtlas(dirPath)
+
+
+    def addAtlas(self, dirPath):
+        """
+        Packs the given directory into a texture atlas (if not done already)
+        and returns it. Images of that directory stored beforehand are dropped
+        so that from now on callers are handed the atlas subsurfaces.
+        """
+
+        dirPath = os.path.normpath(dirPath)
+
+        with self.lock:
+            if dirPath in self.atlasDict:
+                return self.atlasDict[dirPath]
+
+        atlas = TextureAtlas(dirPath, self.decodeImage)
+
+        with self.lock:
+            self.atlasDict[dirPath] = atlas
+
+            self.imageDict = {key: image for key, image in
+                              self.imageDict.items()
+                              if os.path.dirname(key) != dirPath}
+            self.artworkDict = {key: artwork for key, artwork in
+                                self.artworkDict.items()
+                                if key[0] != dirPath}
+
+            return self.atlasDict[dirPath]
+
+
+    def forgetDirectory(self, dirPath):
+        """
+        Drops the stored images and artwork dictionaries of the given
+        directory (e.g. after its files have changed).
+        """
+
+        dirPath = os.path.normpath(dirPath)
+
+        with self.lock:
+            self.imageDict = {key: image for key, image in
+                              self.imageDict.items()
+                              if os.path.dirname(key) != dirPath}
+            self.artworkDict = {key: artwork for key, artwork in
+                                self.artworkDict.items()
+                                if key[0] != dirPath}
+            self.atlasDict.pop(dirPath, None)
+
+
+    def decodeImage(self, imagePath):
+        """
+        Returns a freshly decoded surface of the image file, taken from the
+        bundle if it holds an up to date copy and otherwise from the PNG.
+        """
+
+        key = os.path.normpath(imagePath)
+
+        if self.bundle and self.bundle.hasImage(key):
+            return self.bundle.getImage(key)
+
+        return pygame.image.load(key)
+
+
+    def flush(self):
+        """
+        Empties the cache hence the next request of any image decodes it from
+        disk again. The hit and miss counters are kept.
+        """
+
+        with self.lock:
+            self.imageDict.clear()
+            self.artworkDict.clear()
+            self.atlasDict.clear()
+            self.pendingSet.clear()
+            self.preloadedSet.clear()
+
+
+    def getStats(self):
+        """
+        Returns a dictionary of the hits, misses and amount of stored images
+        and artwork dictionaries.
+        """
+
+        with self.lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "images": len(self.imageDict),
+                    "artworks": len(self.artworkDict),
+                    "atlases": len(self.atlasDict)}
+
+
+
+class TextureAtlas():
+    """
+    Packs every image of a directory into one large converted surface. Each
+    image is then handed out as a subsurface of it, hence a directory needs a
+    single allocation and its tiles or frames lie next to each other in
+    memory.
     """
 
-    imageDict = {}
-    for imageName in imagesList:
-        if not imageName.endswith(".db"):
+    def __init__(self, dirPath, decodeFunction=pygame.image.load, padding=1):
+        """
+        Decodes the images of the directory and packs them row by row (tallest
+        images first) into a surface roughly as wide as it is tall.
+        'decodeFunction' turns an image path into a surface and 'padding' is
+        the gap in pixels between neighbouring images.
+        """
 
+        self.dirPath = dirPath
+        self.padding = padding
+
+        imagesList = [imageName for imageName in sorted(os.listdir(dirPath))
+                      if not imageName.endswith(".db")]
+
+        if not imagesList:
+            raise OSError("No images found in the specified directory.")
+
+        decodedDict = {}
+        for imageName in imagesList:
             imagePath = os.path.join(dirPath, imageName)
+            decodedDict[imageName] = decodeFunction(imagePath)
+
+        self.rectDict = self.packImages(decodedDict)
+
+        width = max(rect.right for rect in self.rectDict.values())
+        height = max(rect.bottom for rect in self.rectDict.values())
+
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 0))
+        surface.blits([(decodedDict[imageName], rect) for imageName, rect in
+                       self.rectDict.items()], doreturn=False)
+
+        self.surface = convertImage(surface)
+        self.subsurfaceDict = {imageName: self.surface.subsurface(rect) for
+                               imageName, rect in self.rectDict.items()}
+
+
+    def packImages(self, decodedDict):
+        """
+        Places the images on shelves (rows) and returns a dictionary of each
+        image's name with its rect inside the atlas.
+        """
+
+        totalArea = 0
+        widestImage = 0
+        for image in decodedDict.values():
+            width, height = image.get_size()
+            totalArea += (width + self.padding) * (height + self.padding)
+            widestImage = max(widestImage, width)
+
+        maxWidth = max(widestImage, int(totalArea ** 0.5))
+
+        # Tallest first keeps the wasted space on each shelf small
+        orderedList = sorted(decodedDict.items(),
+                             key=lambda item: item[1].get_height(),
+                             reverse=True)
+
+        rectDict = {}
+        x, y, shelfHeight = 0, 0, 0
+        for imageName, image in orderedList:
+            width, height = image.get_size()
+
+            if x + width > maxWidth:
+                x = 0
+                y += shelfHeight + self.padding
+                shelfHeight = 0
+
+            rectDict[imageName] = pygame.Rect(x, y, width, height)
+            x += width + self.padding
+            shelfHeight = max(shelfHeight, height)
+
+        return rectDict
+
+
+    def hasImage(self, imageName):
+        """
+        Checks whether the image file name is packed in this atlas.
+        """
+
+        return imageName in self.subsurfaceDict
+
+
+    def getImage(self, imageName):
+        """
+        Returns the subsurface of the given image file name.
+        """
+
+        return self.subsurfaceDict[imageName]
+
+
+
+class ArtworkBundle():
+    """
+    A read-only view of an artwork bundle written by bundle.py. The file is
+    memory-mapped and its surfaces are built straight on top of the mapped
+    pixel buffers, hence nothing is decoded or copied at startup.
+
+    Layout: header (BUNDLEHEADER), JSON index, raw pixel buffers starting at
+    the index's "dataOffset".
+    """
+
+    def __init__(self, bundlePath):
+        """
+        Maps the bundle and reads its index. Entries whose source PNG has
+        been modified, resized or deleted since bundling are left out (those
+        images are then loaded from the PNG as usual).
+        """
+
+        startTime = time.perf_counter()
+
+        self.bundlePath = bundlePath
+
+        with open(bundlePath, "rb") as bundleFile:
+            self.map = mmap.mmap(bundleFile.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+
+        headerSize = struct.calcsize(BUNDLEHEADER)
+        magic, indexLength = struct.unpack_from(BUNDLEHEADER, self.map)
+
+        if magic != BUNDLEMAGIC:
+            self.map.close()
+            raise OSError("The specified file is not an artwork bundle.")
+
+        index = json.loads(
+            self.map[headerSize:headerSize + indexLength].decode("utf-8"))
+
+        self.dataOffset = index["dataOffset"]
+        self.decodeTime = index["decodeTime"]
+
+        self.entryDict = {}
+        self.staleList = []
+        for imagePath, entry in index["images"].items():
+            imagePath = os.path.normpath(imagePath)
+
+            if self.isFresh(imagePath, entry):
+                self.entryDict[imagePath] = entry
+            else:
+                self.staleList.append(imagePath)
+
+        self.loadTime = time.perf_counter() - startTime
+
+
+    def isFresh(self, imagePath, entry):
+        """
+        Checks whether the bundled copy of the image still matches the PNG on
+        disk (same modification time and file size).
+        """
+
+        try:
+            fileStat = os.stat(imagePath)
+        except OSError:
+            return False
+
+        return (fileStat.st_mtime_ns == entry["mtime"] and
+                fileStat.st_size == entry["fileSize"])
+
+
+    def hasImage(self, imagePath):
+        """
+        Checks whether the bundle holds an up to date copy of the image.
+        """
+
+        return imagePath in self.entryDict
+
+
+    def getImage(self, imagePath):
+        """
+        Returns a surface sharing the bundle's memory for the given image.
+        """
+
+        entry = self.entryDict[imagePath]
+        start = self.dataOffset + entry["offset"]
+        end = start + entry["length"]
+
+        return pygame.image.frombuffer(memoryview(self.map)[start:end],
+                                       tuple(entry["size"]),
+                                       BUNDLEPIXELFORMAT)
+
+
+    def getReport(self):
+        """
+        Returns a dictionary comparing the time needed to decode the bundled
+        PNGs (measured when bundling) with the time needed to map the bundle.
+        """
+
+        if self.entryDict or self.staleList:
+            freshRatio = (len(self.entryDict) /
+                          (len(self.entryDict) + len(self.staleList)))
+        else:
+            freshRatio = 0
+
+        return {"images": len(self.entryDict),
+                "stale": len(self.staleList),
+                "loadTime": self.loadTime,
+                "decodeTime": self.decodeTime,
+                "timeSaved": self.decodeTime * freshRatio - self.loadTime}
+
+
+
+class ArtworkManifest():
+    """
+    An in-memory index of the artwork tree. Every directory is listed once
+    and each of its image names is split into its "_" separated tokens, hence
+    a search query such as ("tile", "blue") is answered by intersecting the
+    sets of image names stored under each token rather than by listing and
+    splitting the whole directory again.
+
+    Directories outside of the scanned tree may be indexed from a worker
+    thread (e.g. level prefetching) hence the index is only touched while
+    holding the lock.
+    """
+
+    def __init__(self):
+        """
+        Creates the empty index of the form:
+        directoryDict[dirPath] = {"mtime": ..., "tokens": {token: [names]},
+                                  "splits": {name: [tokens]}}
+        """
+
+        self.lock = threading.RLock()
+        self.directoryDict = {}
+
+
+    def scan(self, rootPath=ART_ROOT):
+        """
+        Indexes every directory under (and including) rootPath.
+        """
+
+        for dirPath, _, _ in os.walk(rootPath):
+            self.indexDirectory(dirPath)
+
+
+    def indexDirectory(self, dirPath):
+        """
+        Lists the directory and (re)builds its token index.
+        """
+
+        dirPath = os.path.normpath(dirPath)
+
+        tokenDict = {}
+        splitDict = {}
+        for imageName in sorted(os.listdir(dirPath)):
+            if imageName.endswith(".db") or \
+                    os.path.isdir(os.path.join(dirPath, imageName)):
+                continue
 
             extensionRemovedString = imageName.split(".")[0]
             splitImgName = extensionRemovedString.split("_")    # convention
 
-            if isMatched(searchQuery, splitImgName):
-                for query in searchQuery:
-                        splitImgName.remove(query)
+            splitDict[imageName] = splitImgName
+            for token in set(splitImgName):
+                tokenDict.setdefault(token, []).append(imageName)
 
-                # Otherwise with the if, the key stored is of form (item,)
-                if len(splitImgName) == 1:
-                    imageDict[splitImgName[0]] = pygame.image.load(imagePath)
-                else:
-                    imageDict[tuple(splitImgName)] = \
-                        pygame.image.load(imagePath)
+        entry = {"mtime": os.stat(dirPath).st_mtime_ns,
+                 "tokens": tokenDict,
+                 "splits": splitDict}
+
+        with self.lock:
+            self.directoryDict[dirPath] = entry
+
+
+    def refresh(self):
+        """
+        Re-indexes only the directories whose modification time changed
+        (files added, removed or renamed), indexes the sub-directories created
+        inside them and forgets deleted ones. Returns the list of changed
+        directories.
+        """
+
+        with self.lock:
+            entriesList = list(self.directoryDict.items())
+
+        changedList = []
+        for dirPath, entry in entriesList:
+            try:
+                mtime = os.stat(dirPath).st_mtime_ns
+            except OSError:
+                with self.lock:
+                    self.directoryDict.pop(dirPath, None)
+                changedList.append(dirPath)
+                continue
+
+            if mtime != entry["mtime"]:
+                self.indexDirectory(dirPath)
+                changedList.append(dirPath)
+
+                # A new sub-directory only changes its parent's mtime
+                for subDirPath, _, _ in os.walk(dirPath):
+                    subDirPath = os.path.normpath(subDirPath)
+
+                    with self.lock:
+                        isIndexed = subDirPath in self.directoryDict
+
+                    if not isIndexed:
+                        self.indexDirectory(subDirPath)
+                        changedList.append(subDirPath)
+
+        return changedList
+
+
+    def query(self, dirPath, *searchQuery):
+        """
+        Returns the dictionary of the images of the directory matched by the
+        search query, keyed as 'loadArtworkFrom' keys them, with their paths
+        as values. Directories outside of the scanned tree are indexed on
+        their first query.
+        """
+
+        key = os.path.normpath(dirPath)
+
+        with self.lock:
+            entry = self.directoryDict.get(key)
+
+        if entry is None:
+            if not os.path.exists(dirPath):
+                raise OSError("Specified directory does not exist.")
+            self.indexDirectory(dirPath)
+
+            with self.lock:
+                entry = self.directoryDict[key]
+
+        if not entry["splits"]:
+            raise OSError("No images found in the specified directory.")
+
+        if searchQuery:
+            matchedNames = set(entry["tokens"].get(searchQuery[0], ()))
+            for query in searchQuery[1:]:
+                matchedNames.intersection_update(entry["tokens"].get(query,
+                                                                     ()))
+        else:
+            matchedNames = entry["splits"]
+
+        pathDict = {}
+        for imageName in matchedNames:
+            splitImgName = list(entry["splits"][imageName])
+            for query in searchQuery:
+                splitImgName.remove(query)
+
+            # Otherwise with the if, the key stored is of form (item,)
+            if len(splitImgName) == 1:
+                pathDict[splitImgName[0]] = os.path.join(dirPath, imageName)
+            else:
+                pathDict[tuple(splitImgName)] = os.path.join(dirPath,
+                                                             imageName)
 
-    return imageDict
+        return pathDict
 
 
-def isMatched(searchQuery, splitImgName):
+    def save(self, manifestPath=ART_MANIFEST):
+        """
+        Writes the index to disk as JSON.
+        """
+
+        try:
+            with self.lock:
+                with open(manifestPath, "w") as manifestFile:
+                    json.dump(self.directoryDict, manifestFile)
+        except OSError:
+            warnings.warn("Could not write the artwork manifest.")
+
+
+    def load(self, manifestPath=ART_MANIFEST):
+        """
+        Reads an index written by 'save' then refreshes the directories that
+        changed since.
+        """
+
+        with open(manifestPath) as manifestFile:
+            directoryDict = json.load(manifestFile)
+
+        with self.lock:
+            self.directoryDict = directoryDict
+
+        self.refresh()
+
+
+
+class LazyArtwork():
     """
-    Compares whether all the search keys are within the name of the image.
-    Returns true if so otherwise false.
+    A handle to the artwork dictionary of (dirPath, *searchQuery) that is only
+    loaded the first time it is needed, e.g. the first time a sprite draws
+    the animation state it belongs to.
     """
-    for query in searchQuery:
-        if query not in splitImgName:
-            return False
-    return True
\ No newline at end of file
+
+    def __init__(self, dirPath, *searchQuery):
+        """
+        Stores the query; nothing is read from disk yet.
+        """
+
+        self.dirPath = dirPath
+        self.searchQuery = searchQuery
+        self.artworkDict = None
+
+
+    def load(self):
+        """
+        Returns the artwork dictionary, loading it on the first call.
+        """
+
+        if self.artworkDict is None:
+            self.artworkDict = loadArtworkFrom(self.dirPath, *self.searchQuery)
+
+        return self.artworkDict
+
+
+    def isLoaded(self):
+        """
+        Checks whether the artwork has been loaded already.
+        """
+
+        return self.artworkDict is not None
+
+
+    def getQuery(self):
+        """
+        Returns the query of the handle in the form used by
+        'loadArtworksFrom'.
+        """
+
+        return (self.dirPath,) + self.searchQuery
+
+
+
+class LazyImage():
+    """
+    A handle to a single image that is only decoded the first time it is
+    drawn. Its size is read from the PNG header beforehand so rects can be
+    built without decoding.
+    """
+
+    def __init__(self, imagePath):
+        """
+        Stores the path; nothing is decoded yet.
+        """
+
+        self.imagePath = imagePath
+        self.image = None
+
+
+    def load(self):
+        """
+        Returns the image surface, loading it on the first call.
+        """
+
+        if self.image is None:
+            self.image = loadImage(self.imagePath)
+
+        return self.image
+
+
+    def getSize(self):
+        """
+        Returns the (width, height) of the image. Only the PNG header is read
+        unless the image is loaded already (or is not a PNG).
+        """
+
+        if self.image is None:
+            with open(self.imagePath, "rb") as imageFile:
+                header = imageFile.read(24)
+
+            # PNG signature (8 bytes) then the IHDR chunk's width and height
+            if header[:8] == b"\x89PNG\r\n\x1a\n" and header[12:16] == b"IHDR":
+                return struct.unpack(">II", header[16:24])
+
+        return self.load().get_size()
+
+
+
+_artworkCache = ArtworkCache()
+_artworkManifest = ArtworkManifest()
+
+
+def convertImage(surface):
+    """
+    Converts the surface to the display's pixel format (keeping per-pixel
+    alpha) which makes blitting faster. Surfaces are returned untouched if no
+    display mode has been set yet.
+    """
+
+    if pygame.display.get_surface() is None:
+        return surface
+
+    return surface.convert_alpha()
+
+
+def loadImage(imagePath):
+    """
+    Loads a single image through the artwork cache. The returned surface is
+    shared by every caller hence should be copied before being modified (e.g.
+    via '.convert()' or '.copy()').
+    """
+
+    return _artworkCache.getImage(imagePath)
+
+
+def warmUp(handlesList, workers=None):
+    """
+    Loads the given lazy artwork handles in advance, decoding all of their
+    images together across one thread pool.
+    """
+
+    handlesList = [handle for handle in handlesList if not handle.isLoaded()]
+    artworkList = loadArtworksFrom([handle.getQuery() for handle in
+                                    handlesList], workers)
+
+    for handle, artworkDict in zip(handlesList, artworkList):
+        handle.artworkDict = artworkDict
+
+
+def convertPendingImages():
+    """
+    Converts the images that were loaded by a worker thread (e.g. a level
+    prefetch). Must be called from the main thread.
+    """
+
+    _artworkCache.convertPending()
+
+
+def getArtworkCacheStats():
+    """
+    Returns the hit and miss counts of the artwork cache.
+    """
+
+    return _artworkCache.getStats()
+
+
+def buildAtlases(*dirPaths):
+    """
+    Packs each of the given directories into a texture atlas right away.
+    Should be called after the display mode is set so that the atlases are
+    converted.
+    """
+
+    for dirPath in dirPaths:
+        _artworkCache.addAtlas(dirPath)
+
+
+def registerAtlases(*dirPaths):
+    """
+    Marks each of the given directories (by default 'ART_ATLASES') to be
+    packed into a texture atlas the first time one of its images is
+    requested, hence startup decodes nothing.
+    """
+
+    if not dirPaths:
+        dirPaths = ART_ATLASES
+
+    for dirPath in dirPaths:
+        _artworkCache.registerAtlas(dirPath)
+
+
+def loadBundle(bundlePath=ART_BUNDLE):
+    """
+    Makes the artwork cache serve images from the given bundle instead of
+    decoding the PNGs. Does nothing if the bundle does not exist. Returns the
+    bundle's report (see 'ArtworkBundle.getReport') or None.
+    """
+
+    if not os.path.exists(bundlePath):
+        return None
+
+    _artworkCache.bundle = ArtworkBundle(bundlePath)
+    return _artworkCache.bundle.getReport()
+
+
+def getBundleReport():
+    """
+    Returns the report of the loaded bundle or None if no bundle is used.
+    """
+
+    if _artworkCache.bundle is None:
+        return None
+
+    return _artworkCache.bundle.getReport()
+
+
+def loadManifest(manifestPath=ART_MANIFEST, rootPath=ART_ROOT):
+    """
+    Prepares the artwork index: read from manifestPath if it exists (only
+    changed directories are re-listed) otherwise rootPath is scanned.
+    """
+
+    if os.path.exists(manifestPath):
+        _artworkManifest.load(manifestPath)
+    else:
+        _artworkManifest.scan(rootPath)
+
+
+def saveManifest(manifestPath=ART_MANIFEST):
+    """
+    Persists the artwork index so the next start skips the scan.
+    """
+
+    _artworkManifest.save(manifestPath)
+
+
+def refreshManifest():
+    """
+    Re-indexes the artwork directories whose files changed and drops their
+    cached images. Returns the list of changed directories.
+    """
+
+    changedList = _artworkManifest.refresh()
+
+    for dirPath in changedList:
+        _artworkCache.forgetDirectory(dirPath)
+
+    return changedList
+
+
+def flushArtworkCache():
+    """
+    Empties the artwork cache (e.g. after a level is left for good).
+    """
+
+    _artworkCache.flush()
+
+
+# TODO: os.sep
+def loadArtworkFrom(dirPath, *searchQuery, workers=None):
+    """
+    The path from the current working directory to the target directory
+    needs to be passed as the argument and the artworks first name before the
+    "_". Then the function proceeds to store those images into a dictionary.
+    For instance to obtain all tile images, the dirPath must be provided and
+    artworkName="tile":
+
+    The dictionary is built only once per (dirPath, searchQuery), any later
+    call is served from the artwork cache. 'workers' is the amount of threads
+    decoding the images (defaults to LOADERWORKERS).
+    """
+
+    return loadArtworksFrom([(dirPath,) + searchQuery], workers)[0]
+
+
+def loadArtworksFrom(queryList, workers=None):
+    """
+    The bulk version of 'loadArtworkFrom': 'queryList' is a list of
+    (dirPath, *searchQuery) tuples. The images of all of them are decoded
+    together across one pool of 'workers' threads. Returns the list of
+    dictionaries in the same order as 'queryList'.
+    """
+
+    if workers is None:
+        workers = LOADERWORKERS
+
+    pathDictList = []
+    for dirPath, *searchQuery in queryList:
+        if _artworkCache.hasArtwork(dirPath, searchQuery):
+            pathDictList.append(None)
+        else:
+            pathDictList.append(_findArtworkPaths(dirPath, *searchQuery))
+
+    imagePathsList = [imagePath for pathDict in pathDictList if pathDict
+                      for imagePath in pathDict.values()]
+    _artworkCache.preloadImages(imagePathsList, workers)
+
+    artworkList = []
+    for (dirPath, *searchQuery), pathDict in zip(queryList, pathDictList):
+
+        # A dictionary stored earlier may have been dropped since (e.g. its
+        # directory was packed into an atlas by this batch), hence its paths
+        # are then resolved again
+        def loadFunction(dirPath=dirPath, searchQuery=searchQuery,
+                         pathDict=pathDict):
+            if pathDict is None:
+                pathDict = _findArtworkPaths(dirPath, *searchQuery)
+
+            return _storeImages(pathDict)
+
+        artworkList.append(_artworkCache.getArtwork(dirPath, searchQuery,
+                                                    loadFunction))
+
+    return artworkList
+
+
+def _findArtworkPaths(dirPath, *searchQuery):
+    """
+    Returns the paths of the images matched by the search query (see
+    'loadArtworkFrom') as answered by the artwork index.
+    """
+
+    return _artworkManifest.query(dirPath, *searchQuery)
+
+
+def _storeImages(pathDict):
+    """
+    Loads the images of a dictionary built by '_findArtworkPaths' keeping
+    the same keys.
+    """
+
+    return {key: loadImage(imagePath) for key, imagePath in pathDict.items()}
\ No newline at end of file
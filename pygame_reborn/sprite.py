@@ -3,7 +3,12 @@
 
 import pygame
 import res
+import render
+import animation
+import collision
+import physics
 import math
+from collections import OrderedDict
 
 
 # Makes it easier to identify where the exceptions stem from
@@ -14,9 +19,30 @@ class spriteError(Exception):
 
 class Sprite():
     """
-    A base class for in-game enemies and players.
+    A base class for in-game enemies and players. The kinematics of a sprite
+    (displacement, velocity, acceleration, physics constants and flags) are a
+    view of its body in the physics world, which steps every body at once.
+    Sprites that never move by physics have no body (see 'hasBody').
     """
 
+    hasBody = True
+
+    dx = physics.bodyProperty("dx")
+    dy = physics.bodyProperty("dy")
+    vx = physics.bodyProperty("vx")
+    vy = physics.bodyProperty("vy")
+    ax = physics.bodyProperty("ax")
+    ay = physics.bodyProperty("ay")
+
+    gForce = physics.bodyProperty("gForce")
+    coefficientFriction = physics.bodyProperty("coefficientFriction")
+    terminalVelocity = physics.bodyProperty("terminalVelocity")
+    timeStep = physics.bodyProperty("timeStep")
+
+    disableGravity = physics.bodyProperty("disableGravity")
+    disableFriction = physics.bodyProperty("disableFriction")
+    overrideDisplacement = physics.bodyProperty("overrideDisplacement")
+
 
     def __init__(self):
         """
@@ -24,6 +50,11 @@ class Sprite():
         class.
         """
 
+        # Released once the sprite is garbage collected
+        self.physicsWorld = physics.physicsWorld
+        if self.hasBody:
+            self.bodyId = self.physicsWorld.addBody(owner=self)
+
         self.stateAction = {"Standing": True,
                             "MovingLeft": False,
                             "MovingRight": False,
@@ -36,79 +67,62 @@ class Sprite():
                                     "Left": False}
 
         self.spritesCollidedDict = {}
-        self.levelSpritesRectDict = {}
+
+        # The rects of the level's sprites, maintained by the level from MOVED
+        # events, and the level's static solids (both empty until the sprite is
+        # placed in a level)
+        self.spatialHash = collision.SpatialHash()
+        self.occupancyGrid = collision.OccupancyGrid((0, 0, 0, 0), 1, 1)
+
+        # The sprites passed through rather than collided into when swept
+        self.sweepIgnoredPrefixes = ("Player", "Door")
 
         self.currentActionState = self.stateAction["Standing"]
 
-        # Variables initialized for animation purposes
-        self.animationNum = 1
-        self.gameFrameCounter = 0
-        self.repeatAnimation = False
-        self.animatedActionState = self.currentActionState
-
-       # Displacement
-        self.dx = 0
-        self.dy = 0
-        # Velocity
-        self.vx = 0
-        self.vy = 0
-        # Acceleration
-        self.ax = 0
-        self.ay = 0
+        # Plays the animation clip of the current action state
+        self.animator = animation.Animator()
 
-        self.overrideDisplacement = False
-        self.disableGravity = False
-        self.disableFriction = False
+        if self.hasBody:
+            # Displacement
+            self.dx = 0
+            self.dy = 0
+            # Velocity
+            self.vx = 0
+            self.vy = 0
+            # Acceleration
+            self.ax = 0
+            self.ay = 0
 
-        self.timeStep = 1   # unit of time in mathematical equations
+            self.overrideDisplacement = False
+            self.disableGravity = False
+            self.disableFriction = False
+
+            self.timeStep = 1   # unit of time in mathematical equations
+
+            self.gForce = 1/3
+            self.coefficientFriction = 0.1
+            self.terminalVelocity = 10
 
-        self.gForce = 1/3
         self.molecularForce = 5     # the gap between two surfaces in pixels
-        self.coefficientFriction = 0.1
         self.walkingSpeed = 1
         self.maxWalkingSpeed = 3
-        self.terminalVelocity = 10
 
 
     def draw(self):
         """
-        Draws the animation for the action that is true in stateAction. It
-        synchronizes the amount of frames available for an animation with the
-        in-game frame rate hence allowing speeding up or slowing down of
-        animation.
+        Draws the animation clip of the action that is true in stateAction.
+        The frame drawn is picked from the time elapsed since the clip started
+        (the clip restarts whenever the action changes) hence animations play
+        at their own rate whatever the in-game FPS.
         """
 
-        if self.currentActionState != self.animatedActionState:
-            self.animatedActionState = self.currentActionState
-            self.gameFrameCounter = 0
-            self.animationNum = 1
-
-        animationDict, animationFPS = (
-            self.stateAnimation[self.currentActionState])
-
-        # The rate at which an animation frame plays for every
-        # in-game frame (causes animations to play at a rate independent
-        # of the in-game FPS).
-        self.playFrame = rsc.GAMEFPS // animationFPS
-        self.gameFrameCounter += 1
+        ticks = pygame.time.get_ticks()
 
-        # Increments the animation frame to be played next every time
-        # the in-game FPS counter reaches the playFrame threshold
-        if self.gameFrameCounter % self.playFrame == 0:
-            self.animationNum += 1
+        self.animator.play(self.stateAnimation[self.currentActionState], ticks)
 
-        # Resets gameFrameCounter so that the modulus calculation above
-        # always involve small numbers.
-        if self.gameFrameCounter == rsc.GAMEFPS:
-            self.gameFrameCounter = 0
-
-        if self.animationNum > len(animationDict):
-            if self.repeatAnimation:
-                self.animationNum = 1
-            else:
-                self.animationNum = len(animationDict)
-
-        self.screen.blit(animationDict[self.animationNum], self.rect)
+        render.renderQueue.submitWorld(render.SPRITELAYER,
+                                       self.animator.getFrame(ticks),
+                                       self.rect.copy())
 
         self.drawProjectiles()
 
@@ -123,78 +137,41 @@ class Sprite():
         pass
 
 
-    def applyGravity(self):
+    def sweepDisplacement(self):
         """
-        Creates gravity, pulling the sprite down via increasing acceleration in
-        the y-direction. If the self.disableGravity flag is triggered, then
-        the influence of gravity is cancelled and the flag is reset for next
-        calculation.
+        Stops the sprite from tunnelling through solids or sprites at high
+        speeds. The rect is swept along the displacement (self.dx, self.dy)
+        and if it would pass right through a solid or sprite (hence ending past
+        it, where the collision checks miss it), the displacement is cut short
+        at the time of impact. The sprite then ends 1 pixel into the solid or
+        sprite, just like a slower sprite would, so that the collision checks
+        apply the normal reaction as usual.
         """
 
-        if not self.disableGravity:
-            self.ay += self.gForce
-        else:
-             self.disableGravity = False
+        contact = collision.sweep(self.rect, self.dx, self.dy,
+                                  self.occupancyGrid, self.spatialHash,
+                                  self.sweepIgnoredPrefixes)
+        if contact is None:
+            return
 
+        timeOfImpact, (normalx, normaly), _, spriteRect = contact
 
-    def applyFriction(self):
-        """
-        Slows the sprite's velocity in the x and y direction hence slows the
-        sprite down to imitate friction (a simple model only).
-        f the self.disableFriction flag is triggered, then friction
-        is not calculated and the flag is reset for next calculation
-        """
+        if self.rect.move(self.dx, self.dy).colliderect(spriteRect):
+            return
 
-        if not self.disableFriction:
+        self.dx *= timeOfImpact
+        self.dy *= timeOfImpact
 
-            # Halts the sprite completely otherwise the velocity would be just
-            # very small but non-zero (since velocity change above is discrete).
-            if (math.fabs(self.vx) - self.coefficientFriction <
-                    self.coefficientFriction):
-                self.vx = 0
-            elif self.vx > 0:
-                self.vx -= self.coefficientFriction
-            elif self.vx < 0:
-                self.vx += self.coefficientFriction
-
-            # Halts the sprite completely otherwise the velocity would be just
-            # very small but non-zero (since velocity change above is discrete).
-            if (math.fabs(self.vy) - self.coefficientFriction <
-                    self.coefficientFriction):
-                self.vy = 0
-            elif self.vy > 0:
-                self.vy -= self.coefficientFriction
-            elif self.vy < 0:
-                self.vy += self.coefficientFriction
-        else:
-            self.disableFriction = False
-
-
-    def calculateVelocity(self):
-        """
-        Calculates the velocity of the sprite in the x and y direction.
-        """
-
-        # v = u + at
-        self.vx = self.vx + self.ax * self.timeStep
-        self.vy = self.vy + self.ay * self.timeStep
-
-
-    def calculateDisplacement(self):
-        """
-        Calculates the displacement of the sprite in the x and y direction.
-        If the self.overrideDisplacement flag is triggered, then displacement
-        is not calculated and the flag is reset for next calculation
-        """
+        # pygame '.colliderect' ignores boundaries hence the extra pixel
+        if normalx < 0:
+            self.dx = spriteRect.left - self.rect.right + 1
+        elif normalx > 0:
+            self.dx = spriteRect.right - self.rect.left - 1
 
-        if not self.overrideDisplacement:
-            # s = ut + 0.5at^2
-            self.dx = (self.vx * self.timeStep) + \
-                      0.5 * self.ax * (self.timeStep ** 2)
-            self.dy = (self.vy * self.timeStep) + \
-                      0.5 * self.ay * (self.timeStep ** 2)
-        else:
-            self.overrideDisplacement = False
+        if normaly < 0:
+            self.dy = spriteRect.top - self.rect.bottom + 1
+        elif normaly > 0:
+            self.dy = spriteRect.bottom - self.rect.top - 1
 
 
     def checkLevelSpritesCollision(self):
@@ -203,9 +180,14 @@ class Sprite():
         its direction of collision and rect in self.spritesCollidedDict. So of
         form:
         self.spritesCollidedDict[spriteName] = (isCollidedDict, spriteRect)
+        Only the sprites near the sprite (see the spatial hash) and the solids
+        in the cells under the sprite (see the occupancy grid) are tested.
         """
 
-        for spriteName, spriteRect in self.levelSpritesRectDict.items():
+        collidedDict = self.spatialHash.queryRect(self.rect)
+        collidedDict.update(self.occupancyGrid.queryRect(self.rect))
+
+        for spriteName, spriteRect in collidedDict.items():
             isCollidedDict = {}
             if self.rect.colliderect(spriteRect):
 
@@ -297,12 +279,11 @@ class Sprite():
     def predictLevelCollision(self):
         """
         Triggers a collide flag in isLevelCollidedDict upon level collision for
-        the sprites next calculated (and yet to be drawn) rect.
+        the sprites next calculated (and yet to be drawn) rect. The sprite's
+        rect itself is only moved once the displacement is swept.
         """
 
-        futureRect = self.rect
-        futureRect.centerx += self.dx
-        futureRect.centery += self.dy
+        futureRect = self.rect.move(self.dx, self.dy)
 
         if futureRect.left <= self.areaBounded.left:
             self.isLevelCollidedDict["Left"] = True
@@ -369,7 +350,6 @@ class Sprite():
             self.vx += self.walkingSpeed
 
         self.changeStateActionTo("MovingRight")
-        self.repeatAnimation = True
 
 
     def moveLeft(self):
@@ -382,24 +362,6 @@ class Sprite():
             self.vx -= self.walkingSpeed
 
         self.changeStateActionTo("MovingLeft")
-        self.repeatAnimation = True
-
-
-    def checkVelocity(self):
-        """
-        Checks whether the sprite has reached the predefined maximum vx.
-        If so, prevents the sprite from exceeding the maximum vx.
-        """
-
-        if self.vx > self.terminalVelocity:
-            self.vx = self.terminalVelocity
-        if self.vx < -self.terminalVelocity:
-            self.vx = -self.terminalVelocity
-
-        if self.vy > self.terminalVelocity:
-            self.vy = self.terminalVelocity
-        if self.vy < -self.terminalVelocity:
-            self.vy = -self.terminalVelocity
 
 
     def resetLevelCollisions(self):
@@ -444,17 +406,6 @@ class Player(Sprite):
 
         self.screen = screen
 
-        self.standingArtworkDict = rsc.loadArtworkFrom(rsc.PLAYERART1)
-        self.movingRightArtworkDict = rsc.loadArtworkFrom(rsc.PLAYERART2)
-        self.movingLeftArtworkDict = rsc.loadArtworkFrom(rsc.PLAYERART3)
-        self.jumpingArtworkDict = rsc.loadArtworkFrom(rsc.PLAYERART4)
-        self.inAirArtworkDict = rsc.loadArtworkFrom(rsc.PLAYERART5)
-        self.shootingRightArtworkDict = rsc.loadArtworkFrom(rsc.PLAYERART6)
-        self.shootingLeftArtworkDict = rsc.loadArtworkFrom(rsc.PLAYERART7)
-        self.shootingTopArtworkDict = rsc.loadArtworkFrom(rsc.PLAYERART8)
-        self.shootingBottomArtworkDict = rsc.loadArtworkFrom(rsc.PLAYERART9)
-        self.deathArtworkDict = rsc.loadArtworkFrom(rsc.PLAYERART10)
-
         self.blankPlayer = BlankPlayer()
         self.state = {0: self.blankPlayer,
                       1: self}
@@ -470,18 +421,31 @@ class Player(Sprite):
                             "ShootBottom": False,
                             "Death": False}
 
-        # 2nd index in the tuple is the animationFPS (independent of ingame FPS)
-        self.stateAnimation = {"Standing": (self.standingArtworkDict, 2),
-                               "MovingRight": (self.movingRightArtworkDict, 5),
-                               "MovingLeft": (self.movingLeftArtworkDict, 5),
-                               "Jumping": (self.jumpingArtworkDict, 3),
-                               "InAir": (self.inAirArtworkDict, 1),
-                               "ShootRight": (self.shootingRightArtworkDict, 3),
-                               "ShootLeft": (self.shootingLeftArtworkDict, 3),
-                               "ShootTop": (self.shootingTopArtworkDict, 3),
-                               "ShootBottom": (self.shootingBottomArtworkDict,
-                                              3),
-                               "Death": (self.deathArtworkDict, 3)}
+        # The clips play at their own FPS (independent of ingame FPS)
+        # The artwork of a state is only loaded once that state is drawn or,
+        # for the movement states, once the player enters a level (see
+        # 'initalize')
+        self.stateAnimation = {
+            "Standing": animation.AnimationClip(
+                rsc.LazyArtwork(rsc.PLAYERART1), 2, animation.LOOP),
+            "MovingRight": animation.AnimationClip(
+                rsc.LazyArtwork(rsc.PLAYERART2), 5, animation.LOOP),
+            "MovingLeft": animation.AnimationClip(
+                rsc.LazyArtwork(rsc.PLAYERART3), 5, animation.LOOP),
+            "Jumping": animation.AnimationClip(
+                rsc.LazyArtwork(rsc.PLAYERART4), 3, animation.ONCE),
+            "InAir": animation.AnimationClip(
+                rsc.LazyArtwork(rsc.PLAYERART5), 1, animation.ONCE),
+            "ShootRight": animation.AnimationClip(
+                rsc.LazyArtwork(rsc.PLAYERART6), 3, animation.ONCE),
+            "ShootLeft": animation.AnimationClip(
+                rsc.LazyArtwork(rsc.PLAYERART7), 3, animation.ONCE),
+            "ShootTop": animation.AnimationClip(
+                rsc.LazyArtwork(rsc.PLAYERART8), 3, animation.ONCE),
+            "ShootBottom": animation.AnimationClip(
+                rsc.LazyArtwork(rsc.PLAYERART9), 3, animation.ONCE),
+            "Death": animation.AnimationClip(
+                rsc.LazyArtwork(rsc.PLAYERART10), 3, animation.ONCE)}
 
         self.bindingsStanding = {pygame.K_RIGHT: self.moveRight,
                                  pygame.K_LEFT: self.moveLeft,
@@ -516,7 +480,9 @@ class Player(Sprite):
                               "Death": self.bindingsDeath}
 
         self.hooksFiredList = []
-        self.levelSpritesRectDict = {}
+        # Kept on screen as the camera scrolls the world under the mouse
+        self.aimScreenPos = None    # where the mouse points on the screen
+        self.aimLine = None         # (start, end) of the aim preview
 
         # Starting player = blankPlayer until summoned by level
         self.currentState = self.state[0]
@@ -524,7 +490,7 @@ class Player(Sprite):
         self.isDead = False
 
         # All the artwork have a constant rect size
-        self.rect = self.standingArtworkDict[0].get_rect()
+        self.rect = self.stateAnimation["Standing"].getFrames()[0].get_rect()
         # player artwork has an extra 6 pixel width
         self.rect.width -= 8
 
@@ -545,95 +511,106 @@ class Player(Sprite):
         For left button mouse clicks, creates and calculates a hook object and
         it's direction, stores it in self.hooksFiredList. For right clicks, if
         the player is in any shooting action state, it changes state to
-        standing. MOVED events are also picked up here and stored.
+        standing.
         """
 
+        if event.type == pygame.MOUSEMOTION:
+            self.aimScreenPos = event.pos
+
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1:
-                clickedx, clickedy = event.pos
-                centerx, centery = self.rect.center
-                transformedVector = (centery - clickedy, clickedx - centerx)
-
-                angleRadians = math.atan2(*transformedVector)
-                angleDegrees = 180*angleRadians/math.pi
+                # The click is on the screen while the player is in the world
+                angleDegrees = self.getAimAngle(render.toWorld(event.pos))
                 origin = self.rect.center
 
                 hook = GrapplingHook(self.screen, origin, angleDegrees,
                                      self.areaBounded,
-                                     self.levelSpritesRectDict)
+                                     self.spatialHash, self.occupancyGrid)
                 self.hooksFiredList = [hook]    # To be changed in the future
 
             if event.button == 3 and self.isShootingActionState():
                 self.changeStateActionTo("Standing")
                 self.hooksFiredList = []
 
-        if event.type == rsc.MOVED:
-            spriteName = event.spriteName
-            spriteRect = event.spriteRect
-            self.levelSpritesRectDict[spriteName] = spriteRect
 
-            if self.hooksFiredList:
-                for hook in self.hooksFiredList:
-                    hook.handleEvent(event)
+    def update(self):
+        """
+        Executes the actions that each binding does in the current action state
+        of the player. Additionally, applies physics on the player (e.g.
+        gravity, friction, etc) and then updates players position. Levels
+        update the player in phases instead (see 'Level.updateSprites'), this
+        steps the physics world for the player alone.
+        """
 
-        if event.type == rsc.CHANGELEVEL:
-            self.levelSpritesRectDict = {}
+        self.updateControls()
+        self.physicsWorld.step()
+        self.updateMotion()
 
 
-    def update(self):
+    def updateControls(self):
         """
         Executes the actions that each binding does in the current action state
-        of the player. Additionally, applies physics on the player (e.g.
-        gravity, friction, etc) and then updates players position.
+        of the player then submits the player's body to be stepped by the
+        physics world (gravity, friction, velocity and displacement). A dead
+        player only plays its death effect.
         """
 
-        if not self.isDead:
-            self.updateProjectiles()
-            self.updateJumpTicker()
-            self.updateStillJumpingTicker()
+        if self.isDead:
+            self.currentActionState = "Death"
+            self.updateDyingTicker()
+            self.applyDeathEffect()
+            return
 
-            self.checkDoorCollision()
-            self.checkCurrentActionState()
-            self.checkCurrentBindings()
-            self.executeCurrentBindings()
+        self.updateProjectiles()
+        self.updateJumpTicker()
+        self.updateStillJumpingTicker()
 
-            self.applyGravity()
-            self.applyFriction()
+        self.checkDoorCollision()
+        self.checkCurrentActionState()
+        self.checkCurrentBindings()
+        self.executeCurrentBindings()
 
-            self.calculateVelocity()
-            self.checkVelocity()    # Restricts maximum velocity
-            self.calculateDisplacement()
+        self.physicsWorld.submit(self.bodyId)
 
-            self.predictLevelCollision()    # sees into the future :o
-            if True in self.isLevelCollidedDict.values():
-                self.applyLevelNormalReaction()
 
-            self.checkLevelSpritesCollision()
-            if self.spritesCollidedDict:
-                self.applyLevelSpritesNormalReaction()
+    def updateMotion(self):
+        """
+        Applies the collisions of the player and then updates players position
+        from the displacement of its body, which the physics world must have
+        stepped since 'updateControls' submitted it.
+        """
 
-            self.checkDoorCollision()
+        if self.isDead:
+            return
 
-            self.checkDeathActionState()
-            self.checkInAirActionState()
-            self.checkStandingActionState()
-            self.checkShootingActionState()
+        self.predictLevelCollision()    # sees into the future :o
+        if True in self.isLevelCollidedDict.values():
+            self.applyLevelNormalReaction()
 
-            self.resetLevelCollisions()
-            self.resetSpritesCollisions()
+        self.checkLevelSpritesCollision()
+        if self.spritesCollidedDict:
+            self.applyLevelSpritesNormalReaction()
 
-            # Updates the players position
-            self.rect.centerx += self.dx
-            self.rect.centery += self.dy
-            rsc.triggerMoveEvent(spriteName="Player", spriteRect=self.rect)
+        self.checkDoorCollision()
 
-            # Reset forces acted upon player
-            self.ax = 0
-            self.ay = 0
-        else:
-            self.currentActionState = "Death"
-            self.updateDyingTicker()
-            self.applyDeathEffect()
+        self.checkDeathActionState()
+        self.checkInAirActionState()
+        self.checkStandingActionState()
+        self.checkShootingActionState()
+
+        self.resetLevelCollisions()
+        self.resetSpritesCollisions()
+
+        # Updates the players position (swept once the reactions have set the
+        # final displacement, so there's no tunnelling whatever the speed)
+        self.sweepDisplacement()
+        self.rect.centerx += self.dx
+        self.rect.centery += self.dy
+        rsc.triggerMoveEvent(spriteName="Player", spriteRect=self.rect)
+
+        # Reset forces acted upon player
+        self.ax = 0
+        self.ay = 0
 
 
     def drawProjectiles(self):
@@ -645,6 +622,42 @@ class Player(Sprite):
         if self.hooksFiredList:
             for hook in self.hooksFiredList:
                 hook.draw()
+        elif GrapplingHook.isRayCast:
+            self.drawAimPreview()
+
+
+    def getAimAngle(self, aimPos):
+        """
+        Returns the angle (in degrees, anticlockwise from the x-axis) from the
+        player's center to the aimed position (in world coordinates).
+        """
+
+        aimx, aimy = aimPos
+        centerx, centery = self.rect.center
+        transformedVector = (centery - aimy, aimx - centerx)
+
+        angleRadians = math.atan2(*transformedVector)
+        return 180*angleRadians/math.pi
+
+
+    def drawAimPreview(self):
+        """
+        Draws a thin line from the player to where a hook fired towards the
+        mouse would anchor. It is the same ray cast as the ray-cast hooks'.
+        """
+
+        if self.aimScreenPos is None:
+            return
+
+        aimPos = render.toWorld(self.aimScreenPos)
+        anchorPoint, _, _ = GrapplingHook.castAnchor(
+            self.rect.center, self.getAimAngle(aimPos), self.areaBounded,
+            self.spatialHash, self.occupancyGrid)
+
+        self.aimLine = (self.rect.center, anchorPoint)
+
+        render.renderQueue.submitWorldLine(render.PROJECTILELAYER,
+                                           (255, 255, 255), *self.aimLine)
 
 
     def updateProjectiles(self):
@@ -775,8 +788,6 @@ class Player(Sprite):
         Causes the player to exponentially to fall down the screen.
         """
 
-        self.repeatAnimation = False
-
         if not self.dyingTicker:
             self.dyingTicker = self.defaultTicker * 0.2
             self.rect.centery *= 1.1
@@ -913,6 +924,7 @@ class Player(Sprite):
 
             self.dx = hook.initialvx * 10
             self.dy = hook.initialvy * 10
+            self.sweepDisplacement()
             self.rect.centerx += self.dx
             self.rect.centery += self.dy
 
@@ -931,17 +943,44 @@ class Player(Sprite):
 
             self.dx = -hook.initialvx * 10
             self.dy = -hook.initialvy * 10
+            self.sweepDisplacement()
             self.rect.centerx += self.dx
             self.rect.centery += self.dy
 
 
-    def initalize(self, areaBounded):
+    def warmUp(self, *actionStates):
+        """
+        Loads the artwork of the given action states in advance (e.g. states
+        that are about to be reached) so their first draw doesn't decode
+        images. Without arguments, every action state is loaded.
+        """
+
+        if not actionStates:
+            actionStates = self.stateAnimation.keys()
+
+        # Clips built from plain frames have nothing to load
+        rsc.warmUp([self.stateAnimation[action].artwork
+                    for action in actionStates
+                    if self.stateAnimation[action].artwork is not None])
+
+
+    def initalize(self, areaBounded, spatialHash, occupancyGrid):
         """
         Initializes the player. Creates an instance variable of the region where
-        the player is bounded to.
+        the player is bounded to, of the spatial hash of the level's sprites and
+        of the occupancy grid of the level's solids.
         """
 
         self.areaBounded = areaBounded
+        self.spatialHash = spatialHash
+        self.occupancyGrid = occupancyGrid
+
+        # Entering a level is a loading point anyway, unlike the first draw
+        # of a state mid-game. Only the states reachable right away (by the
+        # movement keys or by falling) are loaded, shooting and death load on
+        # their first draw
+        self.warmUp("Standing", "MovingRight", "MovingLeft", "Jumping",
+                    "InAir")
 
 
 
@@ -959,6 +998,14 @@ class BlankPlayer():
         pass
 
 
+    def updateControls(self):
+        pass
+
+
+    def updateMotion(self):
+        pass
+
+
     def draw(self):
         pass
 
@@ -973,18 +1020,22 @@ class Enemy(Sprite):
     The main evil doer of the game.
     """
 
-    def __init__(self, screen, x, y):
+    hasBody = False     # stands still, only its fireballs move
+
+    def __init__(self, screen, x, y, spatialHash):
         """
-        Initializes the evil doer.
+        Initializes the evil doer at (x, y) in the level whose sprites are
+        stored in the spatial hash.
         """
 
         super().__init__()
 
         self.screen = screen
 
-        self.standingArtwork = pygame.image.load(rsc.ENEMYART1)
+        # Decoded on the first draw, the size is read from the PNG header
+        self.standingArtwork = rsc.LazyImage(rsc.ENEMYART1)
         # All the artwork have a constant rect size
-        self.rect = self.standingArtwork.get_rect()
+        self.rect = pygame.Rect((0, 0), self.standingArtwork.getSize())
         self.rect.width -= 10
         self.rect.height -= 10
         self.rect.center = (x, y)
@@ -998,25 +1049,21 @@ class Enemy(Sprite):
 
         self.isDead = False
         self.fireballsList = []
-        self.levelSpritesRectDict = {}
+        self.spatialHash = spatialHash
 
         self.defaultTicker = rsc.GAMEFPS
         self.fireballTicker = self.defaultTicker * 3
 
-        rsc.triggerMoveEvent(spriteName="Enemy" + str(id(self)),
-                             spriteRect=self.rect)
+        self.spriteName = "Enemy" + str(id(self))
+        rsc.triggerMoveEvent(spriteName=self.spriteName, spriteRect=self.rect)
 
 
     def handleEvent(self, event):
         """
-        MOVED events are also picked up here and stored.
+        MOVED events are passed on to the fireballs.
         """
 
         if event.type == rsc.MOVED:
-            spriteName = event.spriteName
-            spriteRect = event.spriteRect
-            self.levelSpritesRectDict[spriteName] = spriteRect
-
             if self.fireballsList:
                 for fireball in self.fireballsList:
                     fireball.handleEvent(event)
@@ -1031,6 +1078,14 @@ class Enemy(Sprite):
             self.updateFireballTicker()
 
             self.checkLevelSpritesCollision()
+
+            # A dead enemy and its fireballs can't be collided into anymore
+            if self.isDead:
+                for fireball in list(self.fireballsList):
+                    self.removeFireball(fireball)
+                self.spatialHash.remove(self.spriteName)
+                return
+
             self.checkAggro()
 
             if self.isTargetInRange:
@@ -1048,7 +1103,9 @@ class Enemy(Sprite):
         """
 
         if not self.isDead:
-            self.screen.blit(self.standingArtwork, self.rect)
+            render.renderQueue.submitWorld(render.SPRITELAYER,
+                                           self.standingArtwork.load(),
+                                           self.rect.copy())
 
             if self.fireballsList:
                 for fireball in self.fireballsList:
@@ -1069,11 +1126,20 @@ class Enemy(Sprite):
             self.fireballsList.append(fireball)
 
             if len(self.fireballsList) > 5:
-                del self.fireballsList[0]
+                self.removeFireball(self.fireballsList[0])
 
             self.fireballTicker = self.defaultTicker * 3
 
 
+    def removeFireball(self, fireball):
+        """
+        Drops the fireball along with its rect in the spatial hash.
+        """
+
+        self.fireballsList.remove(fireball)
+        self.spatialHash.remove(fireball.spriteName)
+
+
     def updateFireballs(self):
         """
         Updates the positions of the fired hooks by the player.
@@ -1098,7 +1164,8 @@ class Enemy(Sprite):
         triggers a flag and and calculates the displacement vector.
         """
 
-        for spriteName, spriteRect in self.levelSpritesRectDict.items():
+        for spriteName, spriteRect in \
+                self.spatialHash.queryRect(self.aggroRect).items():
             if spriteName.startswith("Player"):
                 if self.aggroRect.collidepoint(spriteRect.center):
                     self.isTargetInRange = True
@@ -1118,9 +1185,8 @@ class Enemy(Sprite):
         Upon a sprite collision, sets the self.isSpriteCollide flag to true.
         """
 
-        for spriteName, spriteRect in self.levelSpritesRectDict.items():
-            if self.rect.colliderect(spriteRect) and \
-                    spriteName.startswith("Hook"):
+        for spriteName in self.spatialHash.queryRect(self.rect):
+            if spriteName.startswith("Hook"):
                 self.isDead = True
 
 
@@ -1140,10 +1206,12 @@ class Fireball():
         self.x = directionx
         self.y = directiony
 
-        self.fireballArtwork = pygame.image.load(rsc.ENEMYART2)
+        self.fireballArtwork = rsc.loadImage(rsc.ENEMYART2)
         self.rect = self.fireballArtwork.get_rect()
         self.rect.center = origin
 
+        self.spriteName = "Enemy" + str(id(self))
+
         self.levelSpriteRectDict = {}
 
 
@@ -1165,7 +1233,9 @@ class Fireball():
         Draws the fireball.
         """
 
-        self.screen.blit(self.fireballArtwork, self.rect)
+        render.renderQueue.submitWorld(render.PROJECTILELAYER,
+                                       self.fireballArtwork,
+                                       self.rect.copy())
 
 
     def update(self):
@@ -1175,9 +1245,73 @@ class Fireball():
 
         self.rect.centerx += self.x / 100
         self.rect.centery += self.y / 100
-        rsc.triggerMoveEvent("Enemy" + str(id(self)), self.rect)
+        rsc.triggerMoveEvent(self.spriteName, self.rect)
+
+
+
+
+
+class RotationCache():
+    """
+    Memoizes rotated copies of images. Angles are quantized into a fixed
+    amount of buckets so that nearby angles share the same surface and the
+    least recently used surfaces are evicted once 'maxSize' is exceeded.
+    """
+
+    def __init__(self, angleBuckets=120, maxSize=256):
+        """
+        'angleBuckets' is the amount of distinct angles per full turn (e.g.
+        120 buckets is one surface every 3 degrees).
+        """
+
+        self.angleBuckets = angleBuckets
+        self.bucketAngle = 360 / angleBuckets
+        self.maxSize = maxSize
+        self.rotatedDict = OrderedDict()
 
 
+    def quantize(self, angle):
+        """
+        Returns the bucket number of the angle (in degrees).
+        """
+
+        return round(angle / self.bucketAngle) % self.angleBuckets
+
+
+    def getRotated(self, imagePath, angle):
+        """
+        Returns the image rotated by the angle (in degrees) rounded to its
+        bucket. The rotation is only computed on the first request.
+        """
+
+        key = (imagePath, self.quantize(angle))
+
+        if key in self.rotatedDict:
+            self.rotatedDict.move_to_end(key)
+        else:
+            self.rotatedDict[key] = pygame.transform.rotate(
+                rsc.loadImage(imagePath), key[1] * self.bucketAngle)
+
+            if len(self.rotatedDict) > self.maxSize:
+                self.rotatedDict.popitem(last=False)
+
+        return self.rotatedDict[key]
+
+
+    def precompute(self, *imagePaths):
+        """
+        Rotates the given images for every angle bucket in advance (as many
+        as fit within 'maxSize').
+        """
+
+        for imagePath in imagePaths:
+            for bucket in range(self.angleBuckets):
+                self.getRotated(imagePath, bucket * self.bucketAngle)
+
+
+
+# Shared by all hooks, hence firing a hook neither decodes nor rotates images
+hookRotationCache = RotationCache()
 
 
 
@@ -1186,15 +1320,18 @@ class GrapplingHook():
     The projectiles the main player shoots: grappling hook.
     """
 
-    def __init__(self, screen, origin, angle, areaBounded,
-                 levelSpritesRectDict):
+    # Computes where the hook anchors when fired (a ray cast) and only
+    # interpolates its flight, instead of testing collisions every step
+    isRayCast = False
+
+    def __init__(self, screen, origin, angle, areaBounded, spatialHash,
+                 occupancyGrid):
         """
+        Initializes a hook flying from origin at the angle given (in degrees)
+        within the bounded area of the level whose sprites are stored in the
+        spatial hash and whose solids are stored in the occupancy grid.
         """
 
-        # .convert() is omitted as it renders the images completely black
-        self.grapplingEndArtwork = pygame.image.load(rsc.MISCART3)
-        self.grapplingArtwork = pygame.image.load(rsc.MISCART2)
-
         self.screen = screen
         self.areaBounded = areaBounded
 
@@ -1212,16 +1349,19 @@ class GrapplingHook():
         self.dx = self.vx * 3
         self.dy = self.vy * 3
 
-        self.grapplingEndSurface = pygame.transform.rotate(
-            self.grapplingEndArtwork, self.angleDegrees)
-        self.grapplingSurface = pygame.transform.rotate(
-            self.grapplingArtwork, self.angleDegrees)
+        # .convert() is omitted as it renders the images completely black (the
+        # cached artwork is already converted with its alpha channel kept)
+        self.grapplingEndSurface = hookRotationCache.getRotated(
+            rsc.MISCART3, self.angleDegrees)
+        self.grapplingSurface = hookRotationCache.getRotated(
+            rsc.MISCART2, self.angleDegrees)
 
         # Both artwork images have the same rect size
         self.rect = self.grapplingEndSurface.get_rect()
-        self.rect.center = self.origin
-        self.rect.centerx += self.dx
-        self.rect.centery += self.dy
+        # The position is kept in floats (the rect would round every step away)
+        self.posx = self.origin[0] + self.dx
+        self.posy = self.origin[1] + self.dy
+        self.rect.center = (self.posx, self.posy)
         self.afterImageRect = self.rect.copy()
 
         self.isLevelCollide = False
@@ -1232,21 +1372,41 @@ class GrapplingHook():
         self.defaultTicker = rsc.GAMEFPS
         self.initialDelayTicker = self.defaultTicker * 1
 
-        self.levelSpritesRectDict = levelSpritesRectDict
+        self.spatialHash = spatialHash
+        self.occupancyGrid = occupancyGrid
 
+        if self.isRayCast:
+            self.anchorPoint, self.anchorDistance, self.anchorName = \
+                self.castAnchor(origin, angle, areaBounded, spatialHash,
+                                occupancyGrid)
+            self.distanceFlown = math.hypot(self.dx, self.dy)
 
-    def handleEvent(self, event):
+
+    @staticmethod
+    def castAnchor(origin, angle, areaBounded, spatialHash, occupancyGrid):
         """
-        Catches MOVED events fired by any sprite that can be collided into.
+        Casts a ray from the origin at the angle given (in degrees) against the
+        level's solids, its sprites (but the player) and its bounds. Returns
+        (anchorPoint, distance, name) of the first hit, where name is None if
+        the ray reached the bounds of the level.
         """
 
-        if event.type == rsc.MOVED:
-            spriteName = event.spriteName
-            spriteRect = event.spriteRect
+        angleRadians = math.pi * angle / 180
+        direction = (math.cos(angleRadians), -math.sin(angleRadians))
 
-            if spriteName.startswith("Enemy") or \
-                spriteName.startswith("Platform"):
-                self.levelSpritesRectDict[spriteName] = spriteRect
+        maxDistance = collision.getRayExit(origin, direction, areaBounded)
+        hit = collision.castRay(origin, direction, maxDistance, occupancyGrid,
+                                spatialHash, ("Player",))
+
+        if hit is None:
+            distance, name = maxDistance, None
+        else:
+            distance, name, _ = hit
+
+        anchorPoint = (origin[0] + direction[0] * distance,
+                       origin[1] + direction[1] * distance)
+
+        return anchorPoint, distance, name
 
 
     def draw(self):
@@ -1256,10 +1416,13 @@ class GrapplingHook():
 
         if not self.initialDelayTicker:
             if self.isFlying:
-                self.screen.blit(self.grapplingEndSurface, self.rect)
+                render.renderQueue.submitWorld(render.PROJECTILELAYER,
+                                               self.grapplingEndSurface,
+                                               self.rect.copy())
             else:
-                pygame.draw.line(self.screen, (0,0,0), self.origin,
-                                 self.finale, 6)
+                render.renderQueue.submitWorldLine(render.PROJECTILELAYER,
+                                                   (0,0,0), self.origin,
+                                                   self.finale, 6)
 
 
     def update(self):
@@ -1273,22 +1436,60 @@ class GrapplingHook():
         self.updateInitialDelayTicker()
         if not self.isLevelCollide and not self.isSpriteCollide:
             if not self.initialDelayTicker:
-                self.checkLevelCollision()
-                self.checkLevelSpritesCollision()
+                if self.isRayCast:
+                    self.updateRayCastFlight()
+                else:
+                    self.checkLevelCollision()
+                    self.checkLevelSpritesCollision()
 
-                # Allows the grappling hook to accelerate
-                self.vx *= 1.05
-                self.vy *= 1.05
+                    # Allows the grappling hook to accelerate
+                    self.vx *= 1.05
+                    self.vy *= 1.05
 
-                self.dx = self.vx * self.timeStep
-                self.dy = self.vx * self.timeStep
+                    self.dx = self.vx * self.timeStep
+                    self.dy = self.vy * self.timeStep
 
-                self.rect.centerx += self.vx
-                self.rect.centery += self.vy
+                    self.sweepFlight()
+                    self.posx += self.dx
+                    self.posy += self.dy
+                    self.rect.center = (self.posx, self.posy)
         else:
+            # A ray-cast hook never moves once anchored
+            if self.isFlying or not self.isRayCast:
+                rsc.triggerMoveEvent("Hook", self.rect)
+
             self.isFlying = False
             self.finale = self.rect.center
-            rsc.triggerMoveEvent("Hook", self.rect)
+
+
+    def updateRayCastFlight(self):
+        """
+        Moves the hook along its ray towards the anchor point computed when it
+        was fired, accelerating just like a flying hook, without testing any
+        collision. Upon reaching the anchor point, the collide flag of what the
+        ray hit is set to true.
+        """
+
+        # Allows the grappling hook to accelerate
+        self.vx *= 1.05
+        self.vy *= 1.05
+
+        self.distanceFlown += math.hypot(self.vx, self.vy)
+
+        if self.distanceFlown >= self.anchorDistance:
+            self.rect.center = self.anchorPoint
+
+            if self.anchorName is None:
+                self.isLevelCollide = True
+            else:
+                self.isSpriteCollide = True
+        else:
+            progress = self.distanceFlown / self.anchorDistance
+            originx, originy = self.origin
+            anchorx, anchory = self.anchorPoint
+
+            self.rect.center = (originx + (anchorx - originx) * progress,
+                                originy + (anchory - originy) * progress)
 
 
     def updateInitialDelayTicker(self):
@@ -1305,12 +1506,50 @@ class GrapplingHook():
         Upon a sprite collision, sets the self.isSpriteCollide flag to true.
         """
 
-        for spriteName, spriteRect in self.levelSpritesRectDict.items():
-            if self.rect.colliderect(spriteRect) and \
-                    not spriteName.startswith("Player"):
+        if self.occupancyGrid.queryRect(self.rect):
+            self.isSpriteCollide = True
+
+        for spriteName in self.spatialHash.queryRect(self.rect):
+            if not spriteName.startswith("Player"):
                 self.isSpriteCollide = True
 
 
+    def sweepFlight(self):
+        """
+        Sweeps the hook along its displacement (self.dx, self.dy) for this
+        step so that it hits thin solids or sprites whatever its speed
+        (instead of flying past them between two steps). Upon contact, the
+        displacement is cut short so the hook stops touching it and the
+        self.isSpriteCollide flag is set.
+        """
+
+        contact = collision.sweep(self.rect, self.dx, self.dy,
+                                  self.occupancyGrid, self.spatialHash,
+                                  ("Player",))
+        if contact is None:
+            return
+
+        timeOfImpact, (normalx, normaly), _, spriteRect = contact
+
+        self.dx *= timeOfImpact
+        self.dy *= timeOfImpact
+
+        # The contact is relative to the rect, hence the position snaps to it
+        if normalx < 0:
+            self.dx = spriteRect.left - self.rect.right
+        elif normalx > 0:
+            self.dx = spriteRect.right - self.rect.left
+
+        if normaly < 0:
+            self.dy = spriteRect.top - self.rect.bottom
+        elif normaly > 0:
+            self.dy = spriteRect.bottom - self.rect.top
+
+        self.posx, self.posy = self.rect.center
+
+        self.isSpriteCollide = True
+
+
     def checkLevelCollision(self):
         """
         Upon level collision, sets the self.iLevelCollide flag to true.
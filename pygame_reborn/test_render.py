@@ -0,0 +1,139 @@
+### Tests of the renderers: the software surface and SDL2 texture backends must
+### present the same frames from the same render queue.
+###
+### Usage (from the game's directory): python -m pytest test_render.py
+### (runs without a display, SDL's dummy video driver is used)
+
+import os
+import sys
+import unittest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pygame
+import render
+
+
+# Small enough for the frames to be compared pixel by pixel
+SCREENSIZE = (96, 64)
+TILESIZE = 16
+
+
+
+def buildTiles():
+    """
+    Returns a list of opaque tiles of different colours.
+    """
+
+    tilesList = []
+    for colour in ((200, 40, 40), (40, 200, 40), (40, 40, 200), (90, 90, 90)):
+        tile = pygame.Surface((TILESIZE, TILESIZE))
+        tile.fill(colour)
+        tilesList.append(tile)
+
+    return tilesList
+
+
+def submitFrame(frameNum, tilesList, spriteSurface):
+    """
+    Queues a frame: a single background tile (the background builds up tile
+    by tile across frames, like the splash menu's), then a sprite and a line
+    over it. Nothing clears the screens in between frames hence the sprite
+    and the line don't move.
+    """
+
+    columns = SCREENSIZE[0] // TILESIZE
+    coord = ((frameNum % columns) * TILESIZE,
+             (frameNum // columns) * TILESIZE)
+
+    render.renderQueue.submit(render.BACKGROUNDLAYER,
+                              tilesList[frameNum % len(tilesList)], coord)
+    render.renderQueue.submit(render.SPRITELAYER, spriteSurface,
+                              (20, 12))
+    render.renderQueue.submitLine(render.PROJECTILELAYER, (255, 255, 255),
+                                  (0, 60), (90, 4))
+
+
+
+class BackendsTest(unittest.TestCase):
+    """
+    Presents the same frames through both backends and compares the last one.
+    """
+
+    frames = 12
+
+    def setUp(self):
+        pygame.init()
+        render.renderQueue = render.RenderQueue()
+
+        self.tilesList = buildTiles()
+        self.spriteSurface = pygame.Surface((8, 8), pygame.SRCALPHA)
+        self.spriteSurface.fill((255, 255, 0, 255))
+
+
+    def tearDown(self):
+        render.textureRenderer = None
+        pygame.quit()
+
+
+    def presentSurface(self):
+        """
+        Returns the last frame drawn through the software surface backend.
+        """
+
+        screen = pygame.Surface(SCREENSIZE)
+
+        for frameNum in range(self.frames):
+            submitFrame(frameNum, self.tilesList, self.spriteSurface)
+            render.renderQueue.flush(screen)
+
+        return screen
+
+
+    def presentTexture(self):
+        """
+        Returns the last frame drawn through the texture backend (read back
+        from the software renderer).
+        """
+
+        if render.video is None:
+            self.skipTest("The texture renderer requires pygame 2.")
+
+        textureRenderer = render.TextureRenderer(SCREENSIZE, SCREENSIZE,
+                                                 isAccelerated=False)
+        render.textureRenderer = textureRenderer
+        textureRenderer.screen.fill((0, 0, 0))
+
+        for frameNum in range(self.frames):
+            submitFrame(frameNum, self.tilesList, self.spriteSurface)
+            textureRenderer.present(render.renderQueue)
+
+        return textureRenderer.renderer.to_surface()
+
+
+    def testSameFrame(self):
+        surfaceFrame = self.presentSurface()
+        textureFrame = self.presentTexture()
+
+        self.assertEqual(pygame.image.tostring(surfaceFrame, "RGB"),
+                         pygame.image.tostring(textureFrame, "RGB"))
+
+
+    def testBackgroundKept(self):
+        textureFrame = self.presentTexture()
+
+        # Every tile drawn on a previous frame is still there
+        for frameNum in range(self.frames):
+            columns = SCREENSIZE[0] // TILESIZE
+            coord = ((frameNum % columns) * TILESIZE + 1,
+                     (frameNum // columns) * TILESIZE + 1)
+
+            self.assertEqual(textureFrame.get_at(coord)[:3],
+                             self.tilesList[frameNum %
+                                            len(self.tilesList)].get_at((0, 0))
+                             [:3])
+
+
+if __name__ == "__main__":
+    unittest.main()
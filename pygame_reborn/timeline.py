@@ -0,0 +1,192 @@
+### The module that contains the timeline: plays the steps of effects (e.g.
+### the splash menu drawing a few tiles every few milliseconds) and tweens on
+### the game's clock so that nothing ever sleeps inside a frame.
+
+import pygame
+
+
+
+class Timeline():
+    """
+    Plays steps one after another on the game's clock. A step either calls a
+    callback every few milliseconds (see 'every') or tweens a value over a
+    duration (see 'tween'). 'update' is called once per frame and runs
+    whatever became due since the previous frame (catching up if a frame was
+    late), hence the game loop keeps handling events and other work meanwhile.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty timeline.
+        """
+
+        self.stepsList = []
+        self.stepTime = 0       # milliseconds played of the current step
+        self.lastTicks = None
+
+
+    def every(self, interval, callback, *args, times=None):
+        """
+        Appends a step that calls 'callback(*args)' every 'interval'
+        milliseconds until it returns False or has been called 'times' times.
+        An interval of 0 is only allowed along with 'times' (every call would
+        be due at once). Returns the timeline so that steps can be chained.
+        """
+
+        if interval < 0 or (interval == 0 and times is None):
+            raise ValueError("'interval' must be positive, or 0 if 'times' "
+                             "is given.")
+
+        self.stepsList.append(RepeatStep(interval, callback, args, times))
+        return self
+
+
+    def after(self, delay, callback, *args):
+        """
+        Appends a step that calls 'callback(*args)' once after 'delay'
+        milliseconds. Returns the timeline so that steps can be chained.
+        """
+
+        return self.every(delay, callback, *args, times=1)
+
+
+    def tween(self, duration, callback, start=0, end=1, easing=None):
+        """
+        Appends a step that calls 'callback(value)' every frame for 'duration'
+        milliseconds, the value going from start to end. 'easing' maps the
+        progress (0 to 1) of the tween, linearly by default. The last call is
+        always made with end. Returns the timeline so that steps can be
+        chained.
+        """
+
+        self.stepsList.append(TweenStep(duration, callback, start, end,
+                                        easing))
+        return self
+
+
+    def update(self, ticks=None):
+        """
+        Plays the timeline up to 'ticks' (the game's clock in milliseconds,
+        'pygame.time.get_ticks()' by default). The first update starts it.
+        """
+
+        if ticks is None:
+            ticks = pygame.time.get_ticks()
+
+        if self.lastTicks is None:
+            self.lastTicks = ticks
+
+        self.advance(ticks - self.lastTicks)
+        self.lastTicks = ticks
+
+
+    def advance(self, elapsed):
+        """
+        Plays the timeline for the amount of milliseconds elapsed. The time
+        left over by a step that ends is carried over to the next step.
+        """
+
+        self.stepTime += elapsed
+
+        while self.stepsList:
+            leftoverTime = self.stepsList[0].play(self.stepTime)
+
+            if leftoverTime is None:
+                return
+
+            self.stepsList.pop(0)
+            self.stepTime = leftoverTime
+
+
+    def isFinished(self):
+        """
+        Checks whether every step has been played.
+        """
+
+        return not self.stepsList
+
+
+    def clear(self):
+        """
+        Drops every step left to play.
+        """
+
+        self.stepsList = []
+        self.stepTime = 0
+
+
+
+class RepeatStep():
+    """
+    A timeline step that calls a callback at a fixed interval.
+    """
+
+    def __init__(self, interval, callback, args, times):
+        """
+        See 'Timeline.every'.
+        """
+
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.timesLeft = times
+        self.timePlayed = 0
+
+
+    def play(self, stepTime):
+        """
+        Makes every call due by 'stepTime' (milliseconds since the step
+        started). Returns the time left over once the step ends, otherwise
+        None.
+        """
+
+        while stepTime - self.timePlayed >= self.interval:
+            self.timePlayed += self.interval
+
+            isRepeated = self.callback(*self.args) is not False
+
+            if self.timesLeft is not None:
+                self.timesLeft -= 1
+                isRepeated = isRepeated and self.timesLeft > 0
+
+            if not isRepeated:
+                return stepTime - self.timePlayed
+
+        return None
+
+
+
+class TweenStep():
+    """
+    A timeline step that interpolates a value over a duration.
+    """
+
+    def __init__(self, duration, callback, start, end, easing):
+        """
+        See 'Timeline.tween'.
+        """
+
+        self.duration = duration
+        self.callback = callback
+        self.start = start
+        self.end = end
+        self.easing = easing
+
+
+    def play(self, stepTime):
+        """
+        Calls the callback with the value at 'stepTime' (milliseconds since
+        the step started). Returns the time left over once the step ends,
+        otherwise None.
+        """
+
+        if stepTime >= self.duration:
+            self.callback(self.end)
+            return stepTime - self.duration
+
+        progress = stepTime / self.duration
+        if self.easing is not None:
+            progress = self.easing(progress)
+
+        self.callback(self.start + (self.end - self.start) * progress)
+        return None